@@ -0,0 +1,21 @@
+import sys
+sys.path.append("src")
+from src.opening_book import build_book, OpeningBook
+import datetime
+
+if __name__ == "__main__":
+    rows = 8
+    cols = 8
+    # positions reached in fewer than plies moves from the start get a book move
+    plies = 2
+    depth = 4
+    heuristic = "evaluate"
+    strategy = "alpha-beta"
+    path = f"opening_book_{rows}x{cols}.bin"
+    time_start = datetime.datetime.now()
+    count = build_book(path, rows, cols, plies, depth, heuristic, strategy,
+                       progress=lambda done, total: print(f"\r{done}/{total} positions", end=""))
+    print()
+    book = OpeningBook.open(path)
+    print(f"Wrote {count} positions ({book.plies} plies, depth {book.depth}, {book.heuristic}) to {path}")
+    print(f"Time taken: {datetime.datetime.now()-time_start}")
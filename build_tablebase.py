@@ -0,0 +1,14 @@
+import sys
+sys.path.append("src")
+from src.tablebase import build_tablebase, Tablebase
+import datetime
+
+if __name__ == "__main__":
+    max_size = 8
+    path = f"tablebase_{max_size}.bin"
+    time_start = datetime.datetime.now()
+    count = build_tablebase(path, max_size,
+                            progress=lambda size, regions, seconds: print(f"{size} pieces: {regions} regions, {seconds:.1f} s"))
+    tablebase = Tablebase.open(path)
+    print(f"Wrote {count} regions up to {tablebase.max_size} pieces to {path}")
+    print(f"Time taken: {datetime.datetime.now()-time_start}")
@@ -1,59 +1,59 @@
-from multiprocessing.connection import Listener, Client
+from multiprocessing.connection import Listener
 import sys
 sys.path.append("src")
 from src.game import ClobberAgent
 from src.game_state import ClobberGameState
 from src.heuristics import evaluate, mobility_score, piece_count_score, isolation_score
+from src.ponder import latency_report
+from src.protocol import MoveChannel, GameClock, ProtocolError, REASONS, play_match
 import datetime
 
 
-def play_and_listen(heuristic, strategy, max_depth, initial_game_state):
+def play_and_listen(heuristic, strategy, max_depth, initial_game_state, address, authkey, clock_ms=None,
+                    increment_ms=0, ponder=None):
     """
-    Listen for incoming connections and play a game of Clobber.
+    Listen for incoming connections, send the board size and clocks and play a game of Clobber as B.
     """
-
-    address = ('localhost', 6000)
-    listener = Listener(address, authkey=b'secret')
-    agent= ClobberAgent(name="B", initial_game_state=initial_game_state, heuristic=heuristic, strategy=strategy, max_depth=max_depth, adaptive=True)
+    listener = Listener(address, authkey=authkey)
+    agent= ClobberAgent(name="B", initial_game_state=initial_game_state, heuristic=heuristic, strategy=strategy, max_depth=max_depth, adaptive=True, ponder=ponder)
 
     print("Listening for connections...")
-    num_of_moves = 1
-    conn = listener.accept()
+    channel = MoveChannel(listener.accept())
     times_start= datetime.datetime.now()
-    while True:
-        try:
-            move = conn.recv()
-            if move:
-                move=agent.play(move)
-                num_of_moves += 1
-                if not move:
-                    print("Game Over")
-                    print("Total moves played: ", num_of_moves)
-                    print("Winner: B")
-                    print("Time taken : ", datetime.datetime.now()-times_start)
-                    conn.close()
-                    listener.close()
-                    break
-            else:
-                conn.close()
-                listener.close()
-                print(f"Time taken : {datetime.datetime.now()-times_start}")
-                break
-            conn.send(move)
-        except EOFError:
-            print("Connection closed")
-            break
-        except Exception as e:
-            print("An error occurred:", e)
-            break
+    clock = GameClock(clock_ms, increment_ms)
+    try:
+        channel.host_handshake(initial_game_state.rows, initial_game_state.cols, clock_ms, increment_ms)
+        winner, reason = play_match(channel, agent, initial_game_state, "B", clock)
+        print("Game Over")
+        print("Total moves played: ", initial_game_state.ply)
+        print(f"Winner: {winner} ({REASONS[reason]})")
+        print(f"Clock used: W {clock.used['W'] / 1000:.2f} s, B {clock.used['B'] / 1000:.2f} s")
+        print(f"Bytes sent: {channel.bytes_sent}, received: {channel.bytes_received}")
+    except (EOFError, ProtocolError) as e:
+        print("Connection closed:", e)
+    finally:
+        print("Time taken : ", datetime.datetime.now()-times_start)
+        channel.close()
+        listener.close()
+    if agent.ponderer is not None:
+        agent.ponderer.stop()
+    print(latency_report(agent))
+
 
 if __name__ == "__main__":
+    address = ('localhost', 6000)
+    authkey = b'secret'
     rows = 8
     cols = 8
+    # total thinking time per player and the increment per move, None for no clock
+    clock_ms = 60000
+    increment_ms = 500
     heuristic_W = mobility_score
     # alpha-beta or minmax
     strategy_A = 'minmax'
     max_depth_A = 2
+    ponder = 'predict'
     initial_game_state = ClobberGameState(rows, cols)
 
-    play_and_listen(heuristic_W,strategy_A, max_depth_A,  initial_game_state)
+    play_and_listen(heuristic_W,strategy_A, max_depth_A,  initial_game_state, address, authkey, clock_ms,
+                    increment_ms, ponder)
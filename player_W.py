@@ -1,51 +1,46 @@
-from multiprocessing.connection import Listener, Client
+from multiprocessing.connection import Client
 import sys
 sys.path.append("src")
 from src.game import ClobberAgent
-from src.game_state import ClobberGameState
 from src.heuristics import evaluate, mobility_score, piece_count_score, isolation_score
+from src.ponder import latency_report
+from src.protocol import MoveChannel, GameClock, ProtocolError, REASONS, new_game, play_match
 
 
 
-def play_and_listen(heuristic, strategy, max_depth, initial_game_state):
+def play_and_listen(heuristic, strategy, max_depth, address, authkey, ponder=None):
     """
-    Listen for incoming connections and play a game of Clobber.
+    Connect to the host, take the board size and clocks from its handshake and play a game of Clobber as W.
     """
-    address = ('localhost', 6000)
-    conn = Client(address, authkey=b'secret')
-    agent= ClobberAgent(name="W", initial_game_state=initial_game_state, heuristic=heuristic, strategy=strategy, max_depth=max_depth, adaptive=True)
-    print("Listening for connections...")
-    num_of_moves = 1
-    move = agent.play(initial_game_state)
-    while True:
-        try:
-            conn.send(move)
-            # print("Sent move:", move)
-            move = conn.recv()
-            # print("Received move:", move)
-            if move:
-                move=agent.play(move)
-                num_of_moves += 1
-                if not move:
-                    print("Game Over")
-                    print("Total moves played: ", num_of_moves)
-                    print("Winner: W")
-                    conn.close()
-                    break
-            else:
-                conn.close()
-                break
-        except EOFError:
-            print("Connection closed")
-            break
+    channel = MoveChannel(Client(address, authkey=authkey))
+    settings = channel.guest_handshake()
+    game_state = new_game(settings)
+    clock = GameClock(settings["clock_ms"], settings["increment_ms"])
+    agent= ClobberAgent(name="W", initial_game_state=game_state, heuristic=heuristic, strategy=strategy, max_depth=max_depth, adaptive=True, ponder=ponder)
+    print(f"Connected, {settings['rows']}x{settings['cols']} board")
+    try:
+        winner, reason = play_match(channel, agent, game_state, "W", clock)
+        print("Game Over")
+        print("Total moves played: ", game_state.ply)
+        print(f"Winner: {winner} ({REASONS[reason]})")
+        print(f"Clock used: W {clock.used['W'] / 1000:.2f} s, B {clock.used['B'] / 1000:.2f} s")
+        print(f"Bytes sent: {channel.bytes_sent}, received: {channel.bytes_received}")
+    except (EOFError, ProtocolError) as e:
+        print("Connection closed:", e)
+    finally:
+        channel.close()
+    if agent.ponderer is not None:
+        agent.ponderer.stop()
+    print(latency_report(agent))
+
 
 if __name__ == "__main__":
-    rows = 8
-    cols = 8
+    address = ('localhost', 6000)
+    authkey = b'secret'
     heuristic_W = piece_count_score
     # alpha-beta or minmax
     strategy_A = 'alpha-beta'
     max_depth_A = 2
-    initial_game_state = ClobberGameState(rows, cols)
+    ponder = 'predict'
 
-    play_and_listen(heuristic_W,strategy_A, max_depth_A,  initial_game_state)
+    play_and_listen(heuristic_W,strategy_A, max_depth_A, address, authkey, ponder)
@@ -0,0 +1,24 @@
+import sys
+sys.path.append("src")
+from src.game_records import GameRecords
+from src.protocol import REASONS
+import datetime
+
+if __name__ == "__main__":
+    path = "tournament_results.clgr"
+    # game to replay move by move, None to only summarise the file
+    replay = 0
+    time_start = datetime.datetime.now()
+    records = GameRecords(path)
+    moves = records.index["moves"]
+    print(f"{len(records)} games in {path}")
+    if len(records):
+        print(f"White won {len(records.select(winner='W'))}, black won {len(records.select(winner='B'))}, "
+              f"{moves.mean():.1f} moves per game on average")
+    if replay is not None and len(records):
+        record = records[replay]
+        print(f"Game {replay}: {record.white} (W) vs {record.black} (B) on {record.rows}x{record.cols}, "
+              f"winner {record.winner} ({REASONS[record.reason]}), {len(record.moves)} moves")
+        for ply, game_state in enumerate(records.replay(replay)):
+            print(f"After {ply} moves:\n{game_state.board}")
+    print(f"Time taken: {datetime.datetime.now()-time_start}")
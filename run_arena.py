@@ -0,0 +1,43 @@
+import asyncio
+import sys
+sys.path.append("src")
+from src.arena import ArenaServer
+from src.tournament import EngineConfig
+
+
+async def report(server, every_s):
+    while True:
+        await asyncio.sleep(every_s)
+        stats = server.stats()
+        print(f"{stats['games']} games finished, {stats['in_progress']} in progress, "
+              f"{stats['games_per_hour']:.0f} games/hour, move latency mean {stats['mean_move_ms']:.1f} ms, "
+              f"p95 {stats['p95_move_ms']:.1f} ms", flush=True)
+
+
+async def main(host, port, workers, bot, bot_wait_s, report_every_s, records_path, tt_bytes):
+    server = ArenaServer(workers, bot, bot_wait_s, records_path=records_path, tt_bytes=tt_bytes)
+    print(f"Arena listening on {host}:{port}", flush=True)
+    try:
+        await asyncio.gather(server.serve(host, port), report(server, report_every_s))
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    host = 'localhost'
+    port = 6000
+    # processes searching for the built-in engine, None for one per core
+    workers = None
+    # engine playing clients that found no opponent within bot_wait_s seconds
+    bot = EngineConfig('evaluate', 'alpha-beta', 3, False)
+    bot_wait_s = 5.0
+    # transposition table of every built-in engine in a game; a worker keeps one per game in progress
+    tt_bytes = 1024 * 1024
+    report_every_s = 30
+    # finished games are appended here (see src/game_records.py), None to keep no records
+    records_path = "arena_games.clgr"
+
+    try:
+        asyncio.run(main(host, port, workers, bot, bot_wait_s, report_every_s, records_path, tt_bytes))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,38 @@
+import sys
+sys.path.append("src")
+from src.benchmark import run_benchmarks, compare, save_results, load_results
+import os
+
+if __name__ == "__main__":
+    results_path = "benchmark_results.json"
+    baseline_path = "benchmark_baseline.json"
+    save_as_baseline = False
+    tolerance = 0.25
+
+    results = run_benchmarks(board_sizes=((5, 6), (6, 6)), perft_depth=3, search_depth=3,
+                             strategies=("minmax", "alpha-beta"), heuristic_repeat=200, rounds=3, seed=0)
+    save_results(results, results_path)
+    for size, entry in results["perft"].items():
+        print(f"perft {size}: {entry['counts']} {'ok' if entry['correct'] else 'WRONG'}, {entry['nodes_per_s']:.0f} nodes/s")
+    for strategy, per_depth in results["search"].items():
+        for depth, entry in per_depth.items():
+            print(f"{strategy} depth {depth}: {entry['nodes']} nodes, {entry['seconds']:.2f} s, "
+                  f"{entry['nodes_per_s']:.0f} nodes/s")
+    for name, entry in results["heuristics"].items():
+        print(f"{name}: " + ", ".join(f"{metric} {value:.0f}" for metric, value in entry.items()))
+    for size, entry in results["playouts"].items():
+        print(f"playouts {size}: {entry['playouts_per_s']:.0f} playouts/s")
+    for size, entry in results["scaling"].items():
+        print(f"scaling {size} ({entry['moves']} moves): " +
+              ", ".join(f"{metric} {value:.0f}" for metric, value in entry.items() if metric != "moves"))
+
+    if save_as_baseline or not os.path.exists(baseline_path):
+        save_results(results, baseline_path)
+        print(f"Saved baseline to {baseline_path}")
+    else:
+        report = compare(results, load_results(baseline_path), tolerance)
+        for kind, message in report:
+            print(f"{kind.upper()}: {message}")
+        if any(kind in ("error", "regression") for kind, _ in report):
+            sys.exit(1)
+        print("No regressions")
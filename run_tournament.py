@@ -0,0 +1,23 @@
+import sys
+sys.path.append("src")
+from src.tournament import config_grid, schedule_games, run_tournament, summarize, format_table
+import datetime
+
+if __name__ == "__main__":
+    configs = config_grid(heuristics=["evaluate", "mobility_score", "piece_count_score", "isolation_score"],
+                          strategies=["alpha-beta"],
+                          depths=[1, 2, 3],
+                          adaptive=[False])
+    board_sizes = [(5, 6), (6, 6)]
+    specs = schedule_games(configs, board_sizes, games_per_pairing=2, opening_plies=2, seed=2024)
+    results_path = "tournament_results.jsonl"
+    csv_path = "tournament_results.csv"
+    # every game's moves, for replays and datasets (see src/game_records.py)
+    records_path = "tournament_results.clgr"
+    time_start = datetime.datetime.now()
+    results = run_tournament(specs, results_path, workers=None, csv_path=csv_path,
+                             progress=lambda done, total: print(f"\r{done}/{total} games", end=""),
+                             records_path=records_path)
+    print()
+    print(format_table(summarize(results)))
+    print(f"Time taken: {datetime.datetime.now()-time_start}")
@@ -0,0 +1,35 @@
+import sys
+sys.path.append("src")
+from src.game_state import ClobberGameState
+from src.proof_number import ProofNumberSearch
+from src.regions import RegionSolver
+import datetime
+import random
+
+if __name__ == "__main__":
+    board_sizes = [(4, 4), (4, 5), (5, 5)]
+    # random moves played before solving, e.g. 30 to solve late-game 8x8 positions
+    opening_plies = 0
+    seed = 0
+    max_nodes = None
+    time_limit_ms = 10 * 60 * 1000
+    table_bytes = 64 * 1024 * 1024
+    rng = random.Random(seed)
+    for rows, cols in board_sizes:
+        game_state = ClobberGameState(rows, cols)
+        for _ in range(opening_plies):
+            if game_state.is_game_over():
+                break
+            game_state.make_move(rng.choice(game_state.get_possible_moves()))
+        solver = ProofNumberSearch(table_bytes, max_nodes, time_limit_ms, exact_solvers=[RegionSolver()])
+        time_start = datetime.datetime.now()
+        result = solver.solve(game_state)
+        if result["winner"] is None:
+            outcome = f"not solved (proof {result['proof']}, disproof {result['disproof']})"
+        elif result["winner"] == game_state.current_player:
+            outcome = f"{result['winner']} to move wins with {result['move']}"
+        else:
+            outcome = f"{game_state.current_player} to move loses"
+        print(f"{rows}x{cols} after {game_state.ply} moves: {outcome}, {result['nodes']} nodes, "
+              f"table hit rate {result['table']['hit_rate']:.2f}")
+        print(f"Time taken: {datetime.datetime.now()-time_start}")
@@ -0,0 +1,361 @@
+import asyncio
+import itertools
+import socket
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from game_state import ClobberGameState
+from game import ClobberAgent
+from heuristics import HEURISTICS
+from tournament import EngineConfig, engine_label
+from game_records import GameRecordWriter
+from protocol import (MoveChannel, GameClock, ProtocolError, decode_message, encode_hello, encode_move,
+                      encode_result, encode_seat, new_game, play_match, NO_MOVES, TIME_FORFEIT, ILLEGAL_MOVE,
+                      DISCONNECTED)
+
+# agents of the games a pool worker has played moves for, most recent last
+_WORKER_AGENTS = OrderedDict()
+_WORKER_AGENTS_MAX = 64
+
+
+def _drop_finished(live):
+    """
+    Drop the pool worker's agents of games that are no longer in progress (game ids not in live).
+    """
+    for key in [key for key in _WORKER_AGENTS if key[0] not in live]:
+        del _WORKER_AGENTS[key]
+
+
+def _bot_move(game_id, colour, config, game_state, clock_ms, tt_bytes, live):
+    """
+    Search one move for a built-in engine in a pool worker. The worker keeps the agent of every game
+    in progress it has seen (with its transposition table of tt_bytes and adapted heuristic), at most
+    the last 64; agents of finished games are dropped first. Returns (move, nodes).
+    """
+    _drop_finished(live)
+    key = (game_id, colour)
+    agent = _WORKER_AGENTS.pop(key, None)
+    if agent is None:
+        agent = ClobberAgent(colour, game_state, HEURISTICS[config.heuristic], config.strategy, config.depth,
+                             config.adaptive, quiet=True, tt_bytes=tt_bytes)
+    _WORKER_AGENTS[key] = agent
+    while len(_WORKER_AGENTS) > _WORKER_AGENTS_MAX:
+        _WORKER_AGENTS.popitem(last=False)
+    agent.clock_remaining_ms = clock_ms
+    agent.play(game_state)
+    record = agent.move_stats[-1]
+    return record["move"], record["nodes"]
+
+
+class _SeatFailed(Exception):
+    """
+    A player lost by breaking the protocol, disconnecting or conceding.
+    """
+
+    def __init__(self, colour, reason):
+        super().__init__(colour, reason)
+        self.colour = colour
+        self.reason = reason
+
+
+class ClientSeat:
+    """
+    A remote player connected to the arena. Messages are the protocol module's, each framed by a length byte.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.colour = None
+        self.label = "client@{}:{}".format(*writer.get_extra_info("peername")[:2])
+
+    async def recv(self):
+        size = (await self.reader.readexactly(1))[0]
+        return decode_message(await self.reader.readexactly(size))
+
+    async def send(self, data):
+        self.writer.write(bytes([len(data)]) + data)
+        await self.writer.drain()
+
+    async def start(self, settings, colour):
+        self.colour = colour
+        try:
+            await self.send(encode_hello(settings["rows"], settings["cols"], settings["clock_ms"],
+                                         settings["increment_ms"]))
+            await self.send(encode_seat(colour))
+        except ConnectionError:
+            raise _SeatFailed(colour, DISCONNECTED)
+
+    async def next_move(self, game_state, clock):
+        try:
+            kind, payload = await self.recv()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            raise _SeatFailed(self.colour, DISCONNECTED)
+        except ProtocolError:
+            raise _SeatFailed(self.colour, ILLEGAL_MOVE)
+        if kind == "move":
+            return payload
+        if kind == "result" and payload[0] != self.colour:
+            raise _SeatFailed(self.colour, payload[1])
+        raise _SeatFailed(self.colour, ILLEGAL_MOVE)
+
+    async def opponent_moved(self, move):
+        try:
+            await self.send(encode_move(move))
+        except ConnectionError:
+            raise _SeatFailed(self.colour, DISCONNECTED)
+
+    async def finish(self, winner, reason):
+        """
+        Send the result, except to the player who made the last move: that one sends it (see protocol.play_match).
+        """
+        try:
+            if reason == NO_MOVES and winner == self.colour:
+                await asyncio.wait_for(self.recv(), 5)
+            else:
+                await self.send(encode_result(winner, reason))
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, ProtocolError):
+            pass
+        finally:
+            self.writer.close()
+
+
+class BotSeat:
+    """
+    A built-in ClobberAgent whose searches run in the server's process pool. live is the server's set of
+    game ids with a bot seat in progress; the workers drop the agents of all other games.
+    """
+
+    def __init__(self, executor, config, game_id, tt_bytes, live):
+        self.executor = executor
+        self.config = EngineConfig(*config)
+        self.game_id = game_id
+        self.tt_bytes = tt_bytes
+        self.live = live
+        self.colour = None
+        self.label = engine_label(self.config)
+        self.nodes = 0
+
+    async def start(self, settings, colour):
+        self.colour = colour
+        self.live.add(self.game_id)
+
+    async def next_move(self, game_state, clock):
+        clock_ms = clock.remaining[self.colour] if clock.remaining is not None else None
+        move, nodes = await asyncio.get_running_loop().run_in_executor(
+            self.executor, _bot_move, self.game_id, self.colour, self.config, game_state.snapshot(), clock_ms,
+            self.tt_bytes, frozenset(self.live))
+        self.nodes += nodes
+        return move
+
+    async def opponent_moved(self, move):
+        pass
+
+    async def finish(self, winner, reason):
+        self.live.discard(self.game_id)
+        await asyncio.get_running_loop().run_in_executor(self.executor, _drop_finished, frozenset(self.live))
+
+
+class ArenaServer:
+    """
+    asyncio server hosting many games at once. Clients connect over TCP, send a hello with the board size
+    and clocks they want and are paired in arrival order with another client asking for the same settings
+    (the first one plays W). A client left waiting for bot_wait_s seconds plays the built-in engine bot instead.
+    The server keeps the authoritative position and clocks of every game, checks every move and sends the
+    result to both players. Built-in engines search in a process pool, so the event loop never blocks on a
+    search and games in progress scale with the number of workers.
+    With records_path every finished game is appended to that game record file (see game_records).
+    Every built-in engine in a game gets a transposition table of tt_bytes.
+    """
+
+    def __init__(self, workers=None, bot=EngineConfig("evaluate", "alpha-beta", 3, False), bot_wait_s=5.0,
+                 grace_s=1.0, records_path=None, tt_bytes=1024 * 1024):
+        self.executor = ProcessPoolExecutor(workers)
+        self.bot = bot
+        self.tt_bytes = tt_bytes
+        self.bot_games = set()
+        self.bot_wait_s = bot_wait_s
+        self.grace_s = grace_s
+        self.waiting = {}
+        self.games = {}
+        self.results = []
+        self.move_latencies = []
+        self.started = time.perf_counter()
+        self._ids = itertools.count()
+        self.records = GameRecordWriter(records_path) if records_path else None
+
+    async def serve(self, host="localhost", port=6000):
+        server = await asyncio.start_server(self._handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_client(self, reader, writer):
+        seat = ClientSeat(reader, writer)
+        try:
+            kind, settings = await asyncio.wait_for(seat.recv(), 10)
+            if kind != "hello":
+                raise ProtocolError(f"expected a hello, got {kind}")
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, ProtocolError):
+            writer.close()
+            return
+        queue = self.waiting.setdefault(tuple(sorted(settings.items())), [])
+        if queue:
+            # the client that waited longer runs the game
+            queue.pop(0)[1].set_result(seat)
+            return
+        paired = asyncio.get_running_loop().create_future()
+        entry = (seat, paired)
+        queue.append(entry)
+        try:
+            opponent = await asyncio.wait_for(asyncio.shield(paired), self.bot_wait_s if self.bot else None)
+        except asyncio.TimeoutError:
+            if paired.done():
+                opponent = paired.result()
+            else:
+                queue.remove(entry)
+                opponent = BotSeat(self.executor, self.bot, next(self._ids), self.tt_bytes, self.bot_games)
+        await self.run_game({"W": seat, "B": opponent}, settings)
+
+    async def run_game(self, seats, settings):
+        """
+        Play one game between two seats and return its result record.
+        """
+        game_id = next(self._ids)
+        game_state = ClobberGameState(settings["rows"], settings["cols"])
+        clock = GameClock(settings["clock_ms"], settings["increment_ms"])
+        self.games[game_id] = game_state
+        start = time.perf_counter()
+        try:
+            for colour, seat in seats.items():
+                await seat.start(settings, colour)
+            while not game_state.is_game_over():
+                player = game_state.current_player
+                opponent = "B" if player == "W" else "W"
+                timeout = clock.remaining[player] / 1000 + self.grace_s if clock.remaining is not None else None
+                clock.start(player)
+                try:
+                    move = await asyncio.wait_for(seats[player].next_move(game_state, clock), timeout)
+                except asyncio.TimeoutError:
+                    move = None
+                self.move_latencies.append(clock.stop())
+                if move is None or clock.flagged(player):
+                    winner, reason = opponent, TIME_FORFEIT
+                    break
+                if move not in game_state.get_possible_moves():
+                    winner, reason = opponent, ILLEGAL_MOVE
+                    break
+                game_state.make_move(move)
+                await seats[opponent].opponent_moved(move)
+            else:
+                winner, reason = game_state.check_winner(), NO_MOVES
+        except _SeatFailed as e:
+            winner, reason = ("B" if e.colour == "W" else "W"), e.reason
+        for seat in seats.values():
+            await seat.finish(winner, reason)
+        del self.games[game_id]
+        result = {
+            "game_id": game_id,
+            "rows": settings["rows"],
+            "cols": settings["cols"],
+            "white": seats["W"].label,
+            "black": seats["B"].label,
+            "winner": winner,
+            "reason": reason,
+            "moves": game_state.ply,
+            "seconds": round(time.perf_counter() - start, 4),
+            "white_seconds": round(clock.used["W"] / 1000, 4),
+            "black_seconds": round(clock.used["B"] / 1000, 4),
+        }
+        self.results.append(result)
+        if self.records is not None:
+            self.records.append_game(game_state, winner, reason, clock_ms=settings["clock_ms"],
+                                     increment_ms=settings["increment_ms"], white=result["white"],
+                                     black=result["black"])
+            self.records.flush()
+        return result
+
+    async def bot_game(self, white, black, settings):
+        """
+        Play a game between two built-in engines (EngineConfig tuples), e.g. to load the server.
+        """
+        game_id = next(self._ids)
+        return await self.run_game({"W": BotSeat(self.executor, white, game_id, self.tt_bytes, self.bot_games),
+                                    "B": BotSeat(self.executor, black, game_id, self.tt_bytes, self.bot_games)},
+                                   settings)
+
+    def stats(self):
+        """
+        Games finished, games in progress, games per hour since the server started and move latency (ms).
+        """
+        hours = (time.perf_counter() - self.started) / 3600
+        latencies = sorted(self.move_latencies)
+        return {
+            "games": len(self.results),
+            "in_progress": len(self.games),
+            "games_per_hour": len(self.results) / hours if hours else 0.0,
+            "mean_move_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p95_move_ms": latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+        }
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+        if self.records is not None:
+            self.records.close()
+
+
+class _FramedSocket:
+    """
+    Blocking socket with the arena's length-byte framing and the send_bytes / recv_bytes of a
+    multiprocessing.connection Connection, so MoveChannel and play_match work over it unchanged.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.file = sock.makefile("rb")
+
+    def send_bytes(self, data):
+        self.sock.sendall(bytes([len(data)]) + data)
+
+    def recv_bytes(self, maxlength=None):
+        header = self.file.read(1)
+        if not header:
+            raise EOFError
+        data = self.file.read(header[0])
+        if len(data) < header[0]:
+            raise EOFError
+        return data
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+def join_arena(address, rows, cols, clock_ms=None, increment_ms=0):
+    """
+    Connect to an arena server and wait to be paired. Returns (channel, settings, colour).
+    """
+    channel = MoveChannel(_FramedSocket(socket.create_connection(address)))
+    channel.send(encode_hello(rows, cols, clock_ms, increment_ms))
+    kind, settings = channel.recv()
+    if kind != "hello":
+        raise ProtocolError(f"expected a hello, got {kind}")
+    kind, colour = channel.recv()
+    if kind != "seat":
+        raise ProtocolError(f"expected a seat, got {kind}")
+    return channel, settings, colour
+
+
+def play_in_arena(address, make_agent, rows, cols, clock_ms=None, increment_ms=0):
+    """
+    Play one arena game with the agent returned by make_agent(colour, game_state). Returns (colour, winner, reason).
+    The server's clocks decide time forfeits, so the client never claims one from its own clock.
+    """
+    channel, settings, colour = join_arena(address, rows, cols, clock_ms, increment_ms)
+    try:
+        game_state = new_game(settings)
+        agent = make_agent(colour, game_state)
+        winner, reason = play_match(channel, agent, game_state, colour,
+                                    GameClock(settings["clock_ms"], settings["increment_ms"]), referee=True)
+    finally:
+        channel.close()
+    return colour, winner, reason
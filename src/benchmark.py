@@ -0,0 +1,316 @@
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import numpy as np
+from game_state import ClobberGameState, masks_to_array
+from decision_tree import DecisionTree
+from heuristics import HEURISTICS, BATCH_HEURISTICS
+from mcts import batch_playouts
+
+# leaf counts of the move tree from the standard start, checked against a square-by-square move generator
+PERFT_EXPECTED = {
+    (4, 4): [1, 24, 448, 6380, 67296, 529200],
+    (5, 6): [1, 49, 2116, 80063, 2630382],
+    (6, 6): [1, 60, 3244, 157408, 6812036, 261935832],
+    (8, 8): [1, 112, 11848, 1182276, 111070552],
+    (16, 16): [1, 480, 227224, 106072628],
+    (32, 32): [1, 1984, 3922744],
+}
+
+
+def _best_time(function, rounds):
+    """
+    Call function rounds times and return (its last result, the shortest time); the minimum is the
+    least disturbed by whatever else the machine was doing. The garbage collector is off while timing, like in timeit.
+    """
+    best = float('inf')
+    result = None
+    gc.collect()
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            result = function()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        if enabled:
+            gc.enable()
+    return result, best
+
+
+def calibrate(rounds=3):
+    """
+    Loops per second of a fixed pure-Python loop, used to scale throughputs measured on a slower
+    or busier machine before they are compared with a baseline.
+    """
+    def loop():
+        total = 0
+        for i in range(200000):
+            total ^= i * i
+        return total
+    _, seconds = _best_time(loop, rounds)
+    return 200000 / seconds
+
+
+def perft(game_state: ClobberGameState, depth):
+    """
+    Count the leaves of the move tree to the given depth (positions where the game ended count once).
+    """
+    if depth == 0:
+        return 1
+    moves = game_state.get_possible_moves()
+    if depth == 1:
+        return len(moves) or 1
+    if not moves:
+        return 1
+    total = 0
+    for move in moves:
+        game_state.make_move(move)
+        total += perft(game_state, depth - 1)
+        game_state.unmake_move()
+    return total
+
+
+def benchmark_positions(board_sizes=((6, 6), (8, 8)), random_plies=(0, 6, 16), seed=0):
+    """
+    Return a fixed list of (name, game_state): for every board size, the position after each number
+    of random plies (0 is the standard start), all drawn from one seeded generator.
+    """
+    rng = random.Random(seed)
+    positions = []
+    for rows, cols in board_sizes:
+        for plies in random_plies:
+            game = ClobberGameState(rows, cols)
+            for _ in range(plies):
+                moves = game.get_possible_moves()
+                if not moves:
+                    break
+                game.make_move(rng.choice(moves))
+            positions.append((f"{rows}x{cols}+{plies}", game.snapshot()))
+    return positions
+
+
+def run_perft(board_sizes, max_depth, rounds=3):
+    results = {}
+    for rows, cols in board_sizes:
+        game = ClobberGameState(rows, cols)
+        counts, seconds = zip(*(_best_time(lambda: perft(game, depth), rounds) for depth in range(max_depth + 1)))
+        counts = list(counts)
+        expected = PERFT_EXPECTED.get((rows, cols), [])[:max_depth + 1]
+        results[f"{rows}x{cols}"] = {
+            "counts": counts,
+            "correct": counts[:len(expected)] == expected,
+            "nodes_per_s": sum(counts) / sum(seconds),
+        }
+    return results
+
+
+def run_search(positions, strategies, max_depth, heuristic="evaluate", rounds=3):
+    """
+    Search every position with a fresh transposition table to each depth up to max_depth
+    and record nodes, seconds (time to depth, summed over the positions) and nodes/s per strategy and depth.
+    """
+    results = {}
+    for strategy in strategies:
+        per_depth = {}
+        for depth in range(1, max_depth + 1):
+            nodes = 0
+            seconds = 0.0
+            for _, game in positions:
+                def search():
+                    dt = DecisionTree(depth, game, HEURISTICS[heuristic], strategy, game.current_player)
+                    dt.get_best_move(game)
+                    return dt.num_of_visits
+                visits, best = _best_time(search, rounds)
+                nodes += visits
+                seconds += best
+            per_depth[str(depth)] = {
+                "nodes": nodes,
+                "seconds": seconds,
+                "nodes_per_s": nodes / seconds if seconds else 0.0,
+            }
+        results[strategy] = per_depth
+    return results
+
+
+def run_heuristics(positions, repeat, rounds=3):
+    """
+    Measure evaluations per second of every heuristic, one position at a time and
+    (for the batched versions) as one stack of the children of all positions of the same size.
+    """
+    results = {}
+    for name, heuristic in HEURISTICS.items():
+        def evaluate_all():
+            for _ in range(repeat):
+                for _, game in positions:
+                    heuristic(game, game.current_player)
+        _, seconds = _best_time(evaluate_all, rounds)
+        results[name] = {"evals_per_s": repeat * len(positions) / seconds}
+    by_size = {}
+    for _, game in positions:
+        by_size.setdefault((game.rows, game.cols), []).append(game)
+    stacks = []
+    for (rows, cols), games in by_size.items():
+        children = [child for game in games for child in zip(*game.child_positions()[1:])]
+        stacks.append(masks_to_array(rows, cols, [w for w, _ in children], [b for _, b in children]))
+    for name, batch_heuristic in BATCH_HEURISTICS.items():
+        def evaluate_stacks():
+            for _ in range(repeat):
+                for boards in stacks:
+                    batch_heuristic(boards, 'W')
+        _, seconds = _best_time(evaluate_stacks, rounds)
+        results[name]["batch_evals_per_s"] = repeat * sum(len(boards) for boards in stacks) / seconds
+    return results
+
+
+def run_playouts(board_sizes, count=1024, rounds=3, seed=0):
+    """
+    Measure random playouts per second of mcts.batch_playouts, count games at once from the standard start.
+    """
+    results = {}
+    for rows, cols in board_sizes:
+        start = ClobberGameState(rows, cols).encoded_board()
+        rng = np.random.default_rng(seed)
+        _, seconds = _best_time(lambda: batch_playouts(np.repeat(start[None], count, axis=0),
+                                                       np.ones(count, dtype=np.int8), rng), rounds)
+        results[f"{rows}x{cols}"] = {"playouts_per_s": count / seconds}
+    return results
+
+
+def run_scaling(board_sizes=((8, 8), (16, 16), (24, 24), (32, 32)), repeat=2000, search_depth=2, rounds=3, seed=0):
+    """
+    Measure how the per-node costs grow with the board: move generation, make + unmake and game-over
+    checks per second, and alpha-beta nodes per second, on a position a quarter of the way into a random game.
+    """
+    results = {}
+    rng = random.Random(seed)
+    for rows, cols in board_sizes:
+        game = ClobberGameState(rows, cols)
+        for _ in range(rows * cols // 4):
+            game.make_move(rng.choice(game.get_possible_moves()))
+        move = game.get_possible_moves()[0]
+
+        def generate():
+            for _ in range(repeat):
+                game.get_possible_moves()
+
+        def make_unmake():
+            for _ in range(repeat):
+                game.make_move(move)
+                game.unmake_move()
+
+        def game_over():
+            for _ in range(repeat):
+                game.is_game_over()
+
+        def search():
+            dt = DecisionTree(search_depth, game, HEURISTICS["evaluate"], "alpha-beta", game.current_player)
+            dt.get_best_move(game)
+            return dt.num_of_visits
+
+        entry = {"moves": len(game.get_possible_moves())}
+        for name, function in (("movegen_per_s", generate), ("make_unmake_per_s", make_unmake),
+                               ("game_over_per_s", game_over)):
+            _, seconds = _best_time(function, rounds)
+            entry[name] = repeat / seconds
+        nodes, seconds = _best_time(search, rounds)
+        entry["search_nodes_per_s"] = nodes / seconds
+        results[f"{rows}x{cols}"] = entry
+    return results
+
+
+def run_benchmarks(board_sizes=((6, 6), (8, 8)), perft_depth=3, search_depth=3, strategies=("minmax", "alpha-beta"),
+                   heuristic_repeat=200, rounds=3, seed=0, scaling_sizes=((8, 8), (16, 16), (24, 24), (32, 32))):
+    """
+    Run the perft, search, heuristic, playout and board-size scaling benchmarks and return the results as a JSON-ready dict.
+    Every timing is the best of rounds runs.
+    """
+    positions = benchmark_positions(board_sizes, seed=seed)
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "calibration": calibrate(rounds),
+            "config": {"board_sizes": [list(size) for size in board_sizes], "perft_depth": perft_depth,
+                       "search_depth": search_depth, "strategies": list(strategies),
+                       "heuristic_repeat": heuristic_repeat, "rounds": rounds, "seed": seed,
+                       "scaling_sizes": [list(size) for size in scaling_sizes]},
+        },
+        "perft": run_perft(board_sizes, perft_depth, rounds),
+        "search": run_search(positions, strategies, search_depth, rounds=rounds),
+        "heuristics": run_heuristics(positions, heuristic_repeat, rounds),
+        "playouts": run_playouts(board_sizes, rounds=rounds, seed=seed),
+        "scaling": run_scaling(scaling_sizes, rounds=rounds, seed=seed),
+    }
+
+
+def _throughputs(results):
+    """
+    Yield (name, value) of every higher-is-better metric in a results dict.
+    """
+    for size, entry in results.get("perft", {}).items():
+        yield f"perft {size} nodes/s", entry["nodes_per_s"]
+    for strategy, per_depth in results.get("search", {}).items():
+        for depth, entry in per_depth.items():
+            yield f"{strategy} depth {depth} nodes/s", entry["nodes_per_s"]
+    for name, entry in results.get("heuristics", {}).items():
+        for metric, value in entry.items():
+            yield f"{name} {metric.replace('_per_s', '/s')}", value
+    for size, entry in results.get("playouts", {}).items():
+        yield f"playouts {size} playouts/s", entry["playouts_per_s"]
+    for size, entry in results.get("scaling", {}).items():
+        for metric, value in entry.items():
+            if metric.endswith("_per_s"):
+                yield f"scaling {size} {metric.replace('_per_s', '/s')}", value
+
+
+def compare(results, baseline, tolerance=0.15):
+    """
+    Compare results with a baseline run of the same configuration.
+    Returns a list of (kind, message): 'error' for wrong perft counts, 'regression' for a throughput
+    more than tolerance below the baseline, 'changed' for a different search node count
+    (the search itself changed, so its speed is not comparable) and 'improvement' for a throughput
+    more than tolerance above the baseline. Throughputs are scaled by the ratio of the calibration loop speeds.
+    """
+    report = []
+    for size, entry in results.get("perft", {}).items():
+        if not entry["correct"]:
+            report.append(("error", f"perft {size}: counts {entry['counts']} differ from the expected ones"))
+        base = baseline.get("perft", {}).get(size)
+        if base is not None and base["counts"] != entry["counts"]:
+            report.append(("error", f"perft {size}: counts {entry['counts']} differ from baseline {base['counts']}"))
+    for strategy, per_depth in results.get("search", {}).items():
+        for depth, entry in per_depth.items():
+            base = baseline.get("search", {}).get(strategy, {}).get(depth)
+            if base is not None and base["nodes"] != entry["nodes"]:
+                report.append(("changed", f"{strategy} depth {depth}: {entry['nodes']} nodes, "
+                                          f"baseline {base['nodes']}"))
+    base_throughputs = dict(_throughputs(baseline))
+    machine = 1.0
+    if results.get("meta", {}).get("calibration") and baseline.get("meta", {}).get("calibration"):
+        machine = results["meta"]["calibration"] / baseline["meta"]["calibration"]
+    for name, value in _throughputs(results):
+        base = base_throughputs.get(name)
+        if not base:
+            continue
+        ratio = value / base / machine
+        if ratio < 1 - tolerance:
+            report.append(("regression", f"{name}: {value:.0f}, baseline {base:.0f} ({(ratio - 1) * 100:+.0f}%)"))
+        elif ratio > 1 + tolerance:
+            report.append(("improvement", f"{name}: {value:.0f}, baseline {base:.0f} ({(ratio - 1) * 100:+.0f}%)"))
+    return report
+
+
+def save_results(results, path):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
@@ -1,76 +1,406 @@
 import copy
+import math
 import sys
+import time
 import numpy as np
-from game_state import ClobberGameState
-from heuristics import evaluate, mobility_score, piece_count_score, isolation_score
+from game_state import ClobberGameState, masks_to_array
+from game_tree import GameTree
+from transposition import TranspositionTable, SymmetricTable, EXACT, LOWER_BOUND, UPPER_BOUND
+from heuristics import evaluate, mobility_score, piece_count_score, isolation_score, batch_version, PHASES
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the deadline of a time-limited search has passed.
+    """
+
+
+WIN_SCORE = 10 ** 6
+SOLVED_DEPTH = 10000
+
 
 class DecisionTree:
-    def __init__(self, max_depth, game_state: ClobberGameState, heuristic, strategy='minmax', player=None):
+    def __init__(self, max_depth, game_state: ClobberGameState, heuristic, strategy='minmax', player=None,
+                 transposition_table=None, time_limit_ms=None, aspiration_window=None, batch_leaves=False,
+                 region_solver=None, tablebase=None, symmetric=False, verbose=True, stop_event=None):
         """
         Initialize the decision tree with the game state and strategy.
+        strategy: 'minmax', 'alpha-beta' or 'pvs' (negamax principal variation search; with
+        iterative deepening it can use an aspiration window of +-aspiration_window around the
+        previous iteration's value).
+        batch_leaves: in minimax, score the children of depth-1 nodes in one vectorised call when the
+        heuristic has a batched version in heuristics.BATCH_HEURISTICS (alpha-beta and pvs cut most
+        frontier nodes after a few children, so they keep scoring leaves one by one).
+        region_solver: a regions.RegionSolver; late-game positions it can solve exactly are scored
+        +-WIN_SCORE instead of being searched further.
+        tablebase: a tablebase.Tablebase of precomputed region outcomes; it is probed before the region solver.
+        The explicit tree is not built here; use crate_tree() to get a lazily expanded one.
+        Pass a transposition_table to share search results between trees (e.g. across turns); without one a
+        default-sized table is only allocated when the first search needs it.
+        symmetric: key the transposition table by the canonical image of each position (see
+        transposition.SymmetricTable), so mirrored, rotated and colour-swapped positions share entries.
+        verbose: print the analysis when analyze_and_change_heuristic switches heuristics.
+        stop_event: a threading.Event; once it is set, a search that has a deadline raises SearchTimeout.
         """
         self.max_depth = max_depth
-        self.tree = self.crate_tree(game_state)
+        self.tree = None
         self.strategy = strategy
         self.heuristic = heuristic
         self.player = player
         self.num_of_visits = 0
-        self.heuristic_cache = {}  
+        self._transposition_table = transposition_table
+        self.symmetric = symmetric
+        self._symmetric_state = game_state if symmetric else None
+        self._table_view = None
+        self.time_limit_ms = time_limit_ms
+        self.deadline = None
+        self.depth_timings = []
+        self.principal_line = []
+        self._pv_moves = {}
+        self._deadline_ticks = 0
+        self.aspiration_window = aspiration_window
+        self.aspiration_researches = 0
+        self.num_of_cutoffs = 0
+        self.killer_moves = {}
+        self.history_scores = {}
+        self._root_ply = 0
+        self._batch_heuristic = batch_version(heuristic) if batch_leaves else None
+        self.region_solver = region_solver
+        self.tablebase = tablebase
+        self.exact_solvers = [solver for solver in (tablebase, region_solver) if solver is not None]
+        self.num_of_solved = 0
+        self.verbose = verbose
+        self.stop_event = stop_event
 
-    def crate_tree(self, game_state):
+    @property
+    def transposition_table(self):
         """
-        Create a decision tree from the given game state.
+        The table passed to the constructor, or a default one created on first use, so that building a tree
+        costs nothing until it searches.
+        """
+        if self._transposition_table is None:
+            self._transposition_table = TranspositionTable()
+        return self._transposition_table
+
+    @property
+    def _table(self):
+        if self._table_view is None:
+            table = self.transposition_table
+            self._table_view = SymmetricTable(table, self._symmetric_state) if self.symmetric else table
+        return self._table_view
+
+    def crate_tree(self, game_state, max_nodes=None, max_bytes=None):
         """
-        self.tree = self._build_tree(game_state, depth=0)
+        Create a lazily expanded decision tree rooted at the given game state.
+        Nodes are only created on demand, within the given node or memory budget.
+        """
+        self.tree = GameTree(game_state, max_nodes=max_nodes, max_bytes=max_bytes)
         return self.tree
 
-    def _build_tree(self, game_state: ClobberGameState, depth):
+    def principal_variation(self, game_state: ClobberGameState, depth=None):
+        """
+        Walk the principal variation from game_state, expanding only the nodes on it
+        and storing the searched value of every child along the way in self.tree.
+        Returns the list of moves of the principal variation.
+        """
+        depth = self.max_depth if depth is None else depth
+        tree = self.tree
+        if tree is None or tree.state.board_key() != game_state.board_key():
+            tree = self.crate_tree(game_state)
+        state = copy.deepcopy(game_state)
+        self._root_ply = state.ply
+        player = self.player or game_state.current_player
+        node = tree.root
+        line = []
+        for remaining in range(depth, 0, -1):
+            if not tree.expand(node) or not node.children:
+                break
+            maximizing = state.current_player == player
+            for move, child in node.children.items():
+                state.make_move(move)
+                child.value = self._search(state, remaining - 1, not maximizing)
+                state.unmake_move()
+            pick = max if maximizing else min
+            node = pick(node.children.values(), key=lambda child: child.value)
+            node.parent.value = node.value
+            line.append(node.move)
+            state.make_move(node.move)
+        return line
+
+    def _search(self, game_state, depth, maximizing_player):
+        if self.strategy == 'minmax':
+            return self.minimax_search(game_state, depth, maximizing_player)
+        if self.strategy == 'alpha-beta':
+            return self.alfa_beta_search(game_state, depth, float('-inf'), float('inf'), maximizing_player)
+        if self.strategy == 'pvs':
+            sign = 1 if game_state.current_player == self.player else -1
+            return sign * self.pvs_search(game_state, depth, float('-inf'), float('inf'))
+        raise ValueError(f"Unknown strategy: {self.strategy}")
+
+    def get_best_move(self, game_state: ClobberGameState, time_limit_ms=None, known=None):
+        """
+        Get the best move for the current player using the heuristic.
+        The search makes and unmakes moves on game_state in place and leaves it unchanged.
+        With a time limit (argument or self.time_limit_ms) the search deepens iteratively
+        and returns the best move of the deepest fully searched iteration; known is a (depth, move)
+        result already searched for this position (see iterative_deepening).
+        """
+        if time_limit_ms is None:
+            time_limit_ms = self.time_limit_ms
+        if time_limit_ms is not None:
+            return self.iterative_deepening(game_state, time_limit_ms, known)
+        self._root_ply = game_state.ply
+        best_move, _ = self._search_root(game_state, self.max_depth, game_state.get_possible_moves())
+        return best_move
+
+    def _search_root(self, game_state, depth, moves, window=None):
+        """
+        Search every root move to the given depth and return (best_move, value).
+        Ties keep the earliest move. For alpha-beta the best value so far is passed down as alpha,
+        so later root moves are only searched far enough to show they are not better.
+        """
+        if self.strategy == 'pvs':
+            return self._pvs_root(game_state, depth, moves, window)
+        best_move_so_far = (None, float('-inf'))
+        for move in moves:
+            game_state.make_move(move)
+            if self.strategy == 'alpha-beta':
+                move_value = self.alfa_beta_search(game_state, depth - 1, best_move_so_far[1], float('inf'), False)
+            else:
+                move_value = self._search(game_state, depth - 1, False)
+            game_state.unmake_move()
+
+            if move_value > best_move_so_far[1]:
+                best_move_so_far = (move, move_value)
+        return best_move_so_far
+
+    def _pvs_root(self, game_state, depth, moves, window=None):
+        """
+        Principal variation search at the root: the first move gets the full (or aspiration) window,
+        the others a null window and a re-search only if they turn out to be better.
+        """
+        alpha, beta = window if window is not None else (float('-inf'), float('inf'))
+        best_move, best_value = None, float('-inf')
+        for move in moves:
+            game_state.make_move(move)
+            if best_move is None:
+                value = -self.pvs_search(game_state, depth - 1, -beta, -alpha)
+            else:
+                value = -self.pvs_search(game_state, depth - 1, -math.nextafter(alpha, math.inf), -alpha)
+                if alpha < value < beta:
+                    value = -self.pvs_search(game_state, depth - 1, -beta, -alpha)
+            game_state.unmake_move()
+
+            if value > best_value:
+                best_move, best_value = move, value
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+        return best_move, best_value
+
+    def search_root_move(self, game_state: ClobberGameState, move, depth, alpha=float('-inf')):
         """
-        Recursively build the decision tree.
+        Search a single root move to the given depth and return its value for self.player.
+        Values not above alpha are only upper bounds (alpha is ignored by minimax).
         """
-        if self.max_depth is not None and depth >= self.max_depth:
+        self._root_ply = game_state.ply
+        game_state.make_move(move)
+        try:
+            if self.strategy == 'alpha-beta':
+                return self.alfa_beta_search(game_state, depth - 1, alpha, float('inf'), False)
+            if self.strategy == 'pvs':
+                return -self.pvs_search(game_state, depth - 1, float('-inf'), -alpha)
+            return self._search(game_state, depth - 1, False)
+        finally:
+            game_state.unmake_move()
+
+    def iterative_deepening(self, game_state: ClobberGameState, time_limit_ms, known=None):
+        """
+        Search depth 1, 2, ... until the time limit (or max_depth) is reached.
+        Each iteration searches the previous best move first and follows the previous principal
+        variation first. Timings of every completed iteration are stored in self.depth_timings.
+        known: (depth, move) already searched for this position, e.g. by pondering; the search continues
+        at depth + 1 and returns that move if no deeper iteration finishes.
+        """
+        start = time.perf_counter()
+        self.deadline = start + time_limit_ms / 1000
+        self.depth_timings = []
+        self.principal_line = []
+        self._pv_moves = {}
+        moves = game_state.get_possible_moves()
+        if not moves:
+            self.deadline = None
             return None
 
-        if game_state.is_game_over():
-            return game_state.check_winner()
+        # a game can't last longer than the number of pieces left on the board
+        max_depth = game_state.get_num_of_pieces('W') + game_state.get_num_of_pieces('B')
+        if self.max_depth is not None:
+            max_depth = min(max_depth, self.max_depth)
 
-        possible_moves = game_state.get_possible_moves(print_moves=False)
+        best_move = moves[0]
+        depth = 1
+        if known is not None and known[1] in moves:
+            depth, best_move = known[0] + 1, known[1]
+        start_ply = game_state.ply
+        self._root_ply = start_ply
+        while depth <= max_depth:
+            ordered_moves = [best_move] + [move for move in moves if move != best_move]
+            iteration_start = time.perf_counter()
+            visits_before = self.num_of_visits
+            try:
+                window = None
+                if self.aspiration_window is not None and self.strategy == 'pvs' and self.depth_timings:
+                    previous = self.depth_timings[-1]["value"]
+                    window = (previous - self.aspiration_window, previous + self.aspiration_window)
+                move, value = self._search_root(game_state, depth, ordered_moves, window)
+                if window is not None and not window[0] < value < window[1]:
+                    self.aspiration_researches += 1
+                    move, value = self._search_root(game_state, depth, ordered_moves)
+            except SearchTimeout:
+                while game_state.ply > start_ply:
+                    game_state.unmake_move()
+                break
+            best_move = move
+            self.depth_timings.append({
+                "depth": depth,
+                "seconds": time.perf_counter() - iteration_start,
+                "nodes": self.num_of_visits - visits_before,
+                "move": move,
+                "value": value,
+            })
+            self.principal_line = self._collect_principal_line(game_state, best_move, depth)
+            self._pv_moves = self._line_positions(game_state, self.principal_line)
+            depth += 1
+            if time.perf_counter() >= self.deadline:
+                break
+        self.deadline = None
+        self._pv_moves = {}
+        return best_move
 
-        tree = {}
-        for move in possible_moves:
-            copied_game_state = copy.deepcopy(game_state)
-            new_game_state = copied_game_state.make_move(move)
-            tree[move] = self._build_tree(copy.deepcopy(new_game_state), depth + 1)
+    def _check_deadline(self):
+        self._deadline_ticks += 1
+        if not self._deadline_ticks & 255 and (time.perf_counter() >= self.deadline or
+                                               self.stop_event is not None and self.stop_event.is_set()):
+            raise SearchTimeout()
 
-        return tree
-    
-    def get_best_move(self, game_state: ClobberGameState):
+    def _collect_principal_line(self, game_state, best_move, depth):
         """
-        Get the best move for the current player using the heuristic.
+        Follow the best moves stored in the transposition table from the root.
         """
-        best_move_so_far = None
-        if self.strategy == 'minmax':
-            best_move_so_far = (None, float('-inf'))
-            for move in game_state.get_possible_moves():
-                temp_game_state = copy.deepcopy(game_state)
-                temp_game_state.make_move(move)
-                
-                move_value = self.minimax_search(temp_game_state, self.max_depth - 1, False)
-                
-                if move_value > best_move_so_far[1]:
-                    best_move_so_far = (move, move_value)
-        elif self.strategy == 'alpha-beta':
-            best_move_so_far = (None, float('-inf'))
-            for move in game_state.get_possible_moves():
-                temp_game_state = copy.deepcopy(game_state)
-                temp_game_state.make_move(move)
-                
-                move_value = self.alfa_beta_search(temp_game_state, self.max_depth - 1, float('-inf'), float('inf'), False)
-                
-                if move_value > best_move_so_far[1]:
-                    best_move_so_far = (move, move_value)
-        return best_move_so_far[0] if best_move_so_far else None
-    
+        line = [best_move]
+        game_state.make_move(best_move)
+        while len(line) < depth:
+            entry = self._table.probe(self._key(game_state))
+            if entry is None or entry[3] is None or entry[3] not in game_state.get_possible_moves(ordered=False):
+                break
+            line.append(entry[3])
+            game_state.make_move(entry[3])
+        for _ in line:
+            game_state.unmake_move()
+        return line
+
+    def _line_positions(self, game_state, line):
+        """
+        Map the table key of every position on a line to the move played from it.
+        """
+        positions = {}
+        for move in line:
+            positions[self._key(game_state)] = move
+            game_state.make_move(move)
+        for _ in line:
+            game_state.unmake_move()
+        return positions
+
+    def _key(self, game_state):
+        """
+        Transposition table key of the position: the Zobrist key, or the canonical key in symmetric mode.
+        """
+        if self.symmetric:
+            return game_state.canonical_key()
+        return game_state.zobrist
+
+    def _promote_pv_move(self, key, moves):
+        """
+        Put the previous iteration's principal variation move first.
+        """
+        pv_move = self._pv_moves.get(key)
+        if pv_move is not None and pv_move in moves:
+            moves.remove(pv_move)
+            moves.insert(0, pv_move)
+        return moves
+
+    def _order_moves(self, game_state, key, moves, tt_move, depth):
+        """
+        Order moves for alpha-beta and PVS: principal variation move, transposition table move,
+        the two killer moves of this ply, then history score plus a static score
+        (opponent pieces next to the captured square, i.e. follow-up captures).
+        Equal scores keep the generation order. Right above the leaves (depth 1) only the
+        first four are moved to the front, as scoring every move costs more than it saves there.
+        """
+        if len(moves) < 2:
+            return moves
+        pv_move = self._pv_moves.get(key) if self._pv_moves else None
+        killers = self.killer_moves.get(game_state.ply - self._root_ply, ())
+        if depth <= 1:
+            for move in reversed([m for m in (pv_move, tt_move, *killers) if m is not None]):
+                if move in moves:
+                    moves.remove(move)
+                    moves.insert(0, move)
+            return moves
+        history = self.history_scores
+        opponent = 'B' if game_state.current_player == 'W' else 'W'
+
+        def score(move):
+            if move == pv_move:
+                return 4e12
+            if move == tt_move:
+                return 3e12
+            if move in killers:
+                return 2e12 - killers.index(move)
+            return history.get(move, 0) + game_state.adjacent_count(move[1], opponent)
+
+        return sorted(moves, key=score, reverse=True)
+
+    def _record_cutoff(self, game_state, move, depth):
+        """
+        Remember a move that caused a beta cut-off as a killer for its ply and in the history table.
+        """
+        self.num_of_cutoffs += 1
+        ply = game_state.ply - self._root_ply
+        killers = self.killer_moves.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        self.history_scores[move] = self.history_scores.get(move, 0) + depth * depth
+
+    def _solve_exactly(self, game_state, key):
+        """
+        Return +-WIN_SCORE for self.player if the tablebase or the region solver can solve the position,
+        otherwise None.
+        """
+        for solver in self.exact_solvers:
+            winner = solver.winner(game_state)
+            if winner is not None:
+                break
+        else:
+            return None
+        self.num_of_solved += 1
+        result = WIN_SCORE if winner == self.player else -WIN_SCORE
+        self._table.store(key, SOLVED_DEPTH, EXACT, result)
+        return result
+
+    def _score_frontier(self, game_state, direction):
+        """
+        Score all children of a depth-1 node with one call of the batched heuristic.
+        direction is 1 to take the maximum and -1 to take the minimum (first best move wins ties).
+        Returns (best_move, value).
+        """
+        moves, whites, blacks = game_state.child_positions()
+        boards = masks_to_array(game_state.rows, game_state.cols, whites, blacks)
+        values = self._batch_heuristic(boards, self.player)
+        self.num_of_visits += len(moves)
+        index = int(np.argmax(values * direction))
+        return moves[index], values[index].item()
+
     def minimax_search(self, game_state: ClobberGameState, depth, maximizing_player):
         """
         Perform a minimax search on the game state.
@@ -78,102 +408,199 @@ class DecisionTree:
         depth: Depth of the search
         maximizing_player: Boolean indicating if it's the maximizing player's turn        
         """
-        state_key = (str(game_state.board), depth, maximizing_player)
-        if state_key in self.heuristic_cache:
-            return self.heuristic_cache[state_key]
+        if self.deadline is not None:
+            self._check_deadline()
+        table = self._table
+        key = game_state.canonical_key() if self.symmetric else game_state.zobrist
+        entry = table.probe(key)
+        if entry is not None and entry[0] >= depth and entry[1] == EXACT:
+            return entry[2]
             
+        if self.exact_solvers:
+            result = self._solve_exactly(game_state, key)
+            if result is not None:
+                return result
+
         if depth == 0 or game_state.is_game_over():
             result = self.heuristic(game_state, self.player)
-            self.heuristic_cache[state_key] = result
+            table.store(key, depth, EXACT, result)
             return result
 
-        possible_moves = game_state.get_possible_moves()
-        if not possible_moves:  
-            result = self.heuristic(game_state, self.player)
-            self.heuristic_cache[state_key] = result
+        if depth == 1 and self._batch_heuristic is not None:
+            best_move, result = self._score_frontier(game_state, 1 if maximizing_player else -1)
+            table.store(key, depth, EXACT, result, best_move)
             return result
 
+        possible_moves = game_state.get_possible_moves(ordered=False)
+        if self._pv_moves:
+            possible_moves = self._promote_pv_move(key, possible_moves)
+        best_move = None
         if maximizing_player:
             max_eval = float('-inf')
             for move in possible_moves:
                 self.num_of_visits += 1
-                
-                temp_game_state = copy.deepcopy(game_state)
-                temp_game_state.make_move(move)
-                
-                eval_value = self.minimax_search(temp_game_state, depth - 1, False)
-                max_eval = max(max_eval, eval_value)
+                game_state.make_move(move)
+                eval_value = self.minimax_search(game_state, depth - 1, False)
+                game_state.unmake_move()
+                if eval_value > max_eval:
+                    max_eval, best_move = eval_value, move
             
-            self.heuristic_cache[state_key] = max_eval
+            table.store(key, depth, EXACT, max_eval, best_move)
             return max_eval
         else:
             min_eval = float('inf')
             for move in possible_moves:
                 self.num_of_visits += 1
-                
-                temp_game_state = copy.deepcopy(game_state)
-                temp_game_state.make_move(move)
-                
-                eval_value = self.minimax_search(temp_game_state, depth - 1, True)
-                min_eval = min(min_eval, eval_value)
+                game_state.make_move(move)
+                eval_value = self.minimax_search(game_state, depth - 1, True)
+                game_state.unmake_move()
+                if eval_value < min_eval:
+                    min_eval, best_move = eval_value, move
             
-            self.heuristic_cache[state_key] = min_eval
+            table.store(key, depth, EXACT, min_eval, best_move)
             return min_eval
     
     def alfa_beta_search(self, game_state: ClobberGameState, depth, alpha, beta, maximizing_player):
         """
         Perform an alpha-beta search on the game state.
+        Values that caused a cut-off are stored in the transposition table as bounds, not exact values.
         """
-        state_key = (str(game_state.board), depth, maximizing_player)
-        if state_key in self.heuristic_cache:
-            return self.heuristic_cache[state_key]
+        if self.deadline is not None:
+            self._check_deadline()
+        table = self._table
+        key = game_state.canonical_key() if self.symmetric else game_state.zobrist
+        alpha_orig, beta_orig = alpha, beta
+        entry = table.probe(key)
+        if entry is not None and entry[0] >= depth:
+            stored_depth, flag, value, _ = entry
+            if flag == EXACT:
+                return value
+            if flag == LOWER_BOUND:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if beta <= alpha:
+                return value
             
-        if depth == 0 or game_state.is_game_over():
-            result = self.heuristic(game_state, self.player)
-            self.heuristic_cache[state_key] = result
-            return result
+        if self.exact_solvers:
+            result = self._solve_exactly(game_state, key)
+            if result is not None:
+                return result
 
-        possible_moves = game_state.get_possible_moves(print_moves=False)
-        if not possible_moves:  
+        if depth == 0 or game_state.is_game_over():
             result = self.heuristic(game_state, self.player)
-            self.heuristic_cache[state_key] = result
+            table.store(key, depth, EXACT, result)
             return result
 
+        possible_moves = self._order_moves(game_state, key, game_state.get_possible_moves(ordered=False),
+                                           entry[3] if entry is not None else None, depth)
+        best_move = None
         if maximizing_player:
-            max_eval = float('-inf')
+            best_eval = float('-inf')
             for move in possible_moves:
                 self.num_of_visits += 1
+                game_state.make_move(move)
+                eval_value = self.alfa_beta_search(game_state, depth - 1, alpha, beta, False)
+                game_state.unmake_move()
                 
-                temp_game_state = copy.deepcopy(game_state)
-                temp_game_state.make_move(move)
-                
-                eval_value = self.alfa_beta_search(temp_game_state, depth - 1, alpha, beta, False)
-                
-                max_eval = max(max_eval, eval_value)
+                if eval_value > best_eval:
+                    best_eval, best_move = eval_value, move
                 alpha = max(alpha, eval_value)
                 if beta <= alpha:
+                    self._record_cutoff(game_state, move, depth)
                     break
-            
-            self.heuristic_cache[state_key] = max_eval
-            return max_eval
         else:
-            min_eval = float('inf')
+            best_eval = float('inf')
             for move in possible_moves:
                 self.num_of_visits += 1
+                game_state.make_move(move)
+                eval_value = self.alfa_beta_search(game_state, depth - 1, alpha, beta, True)
+                game_state.unmake_move()
                 
-                temp_game_state = copy.deepcopy(game_state)
-                temp_game_state.make_move(move)
-                
-                eval_value = self.alfa_beta_search(temp_game_state, depth - 1, alpha, beta, True)
-                
-                min_eval = min(min_eval, eval_value)
+                if eval_value < best_eval:
+                    best_eval, best_move = eval_value, move
                 beta = min(beta, eval_value)
                 if beta <= alpha:
+                    self._record_cutoff(game_state, move, depth)
                     break
-            
-            self.heuristic_cache[state_key] = min_eval
-            return min_eval
+
+        if best_eval <= alpha_orig:
+            flag = UPPER_BOUND
+        elif best_eval >= beta_orig:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        table.store(key, depth, flag, best_eval, best_move)
+        return best_eval
     
+    def pvs_search(self, game_state: ClobberGameState, depth, alpha, beta):
+        """
+        Negamax principal variation search. Returns the value from the point of view of the side to move;
+        the transposition table keeps values from self.player's point of view like the other strategies.
+        """
+        if self.deadline is not None:
+            self._check_deadline()
+        table = self._table
+        key = game_state.canonical_key() if self.symmetric else game_state.zobrist
+        sign = 1 if game_state.current_player == self.player else -1
+        alpha_orig, beta_orig = alpha, beta
+        entry = table.probe(key)
+        if entry is not None and entry[0] >= depth:
+            stored_depth, flag, value, _ = entry
+            value *= sign
+            if sign < 0 and flag != EXACT:
+                flag = LOWER_BOUND if flag == UPPER_BOUND else UPPER_BOUND
+            if flag == EXACT:
+                return value
+            if flag == LOWER_BOUND:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if beta <= alpha:
+                return value
+
+        if self.exact_solvers:
+            result = self._solve_exactly(game_state, key)
+            if result is not None:
+                return sign * result
+
+        if depth == 0 or game_state.is_game_over():
+            result = self.heuristic(game_state, self.player)
+            table.store(key, depth, EXACT, result)
+            return sign * result
+
+        possible_moves = self._order_moves(game_state, key, game_state.get_possible_moves(ordered=False),
+                                           entry[3] if entry is not None else None, depth)
+        best_eval, best_move = float('-inf'), None
+        for move in possible_moves:
+            self.num_of_visits += 1
+            game_state.make_move(move)
+            if best_move is None:
+                eval_value = -self.pvs_search(game_state, depth - 1, -beta, -alpha)
+            else:
+                eval_value = -self.pvs_search(game_state, depth - 1, -math.nextafter(alpha, math.inf), -alpha)
+                if alpha < eval_value < beta:
+                    eval_value = -self.pvs_search(game_state, depth - 1, -beta, -alpha)
+            game_state.unmake_move()
+
+            if eval_value > best_eval:
+                best_eval, best_move = eval_value, move
+            alpha = max(alpha, eval_value)
+            if beta <= alpha:
+                self._record_cutoff(game_state, move, depth)
+                break
+
+        if best_eval <= alpha_orig:
+            flag = UPPER_BOUND
+        elif best_eval >= beta_orig:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        if sign < 0 and flag != EXACT:
+            flag = LOWER_BOUND if flag == UPPER_BOUND else UPPER_BOUND
+        table.store(key, depth, flag, sign * best_eval, best_move)
+        return best_eval
+
     def analyze_and_change_heuristic(self, game_state: ClobberGameState):
         """
         Analyze the game state and change the heuristic based on the analysis.
@@ -197,12 +624,8 @@ class DecisionTree:
         max_score = max(scores.values()) + epsilon
         normalized_scores = {k: v/max_score for k, v in scores.items()}
         
-        if game_progress < 0.3: 
-            weights = {"mobility": 0.7, "piece_count": 0.2, "isolation": 0.1}
-        elif game_progress < 0.7:
-            weights = {"mobility": 0.4, "piece_count": 0.4, "isolation": 0.2}
-        else: 
-            weights = {"mobility": 0.2, "piece_count": 0.3, "isolation": 0.5}
+        phase, weights = next((index, weights) for index, (until, weights) in enumerate(PHASES)
+                              if game_progress < until or index == len(PHASES) - 1)
         
         weighted_scores = {
             "mobility": normalized_scores["mobility"] * weights["mobility"],
@@ -224,11 +647,13 @@ class DecisionTree:
             old_heuristic_name = next((name for name, func in heuristic_map.items() 
                                       if func.__code__ == self.heuristic.__code__), "unknown")
             
-            print(f"Game progress: {game_progress:.2f} (Phase: {'early' if game_progress < 0.3 else 'mid' if game_progress < 0.7 else 'late'})")
-            print(f"Raw scores: Mobility={mobility:.2f}, Piece Count={piece_count:.2f}, Isolation={isolation:.2f}")
-            print(f"Normalized scores: {', '.join([f'{k}={v:.2f}' for k, v in normalized_scores.items()])}")
-            print(f"Weighted scores: {', '.join([f'{k}={v:.2f}' for k, v in weighted_scores.items()])}")
-            print(f"Changing heuristic from {old_heuristic_name} to {best_heuristic_name}")
+            if self.verbose:
+                phase_name = ('early', 'mid', 'late')[phase] if len(PHASES) == 3 else str(phase)
+                print(f"Game progress: {game_progress:.2f} (Phase: {phase_name})")
+                print(f"Raw scores: Mobility={mobility:.2f}, Piece Count={piece_count:.2f}, Isolation={isolation:.2f}")
+                print(f"Normalized scores: {', '.join([f'{k}={v:.2f}' for k, v in normalized_scores.items()])}")
+                print(f"Weighted scores: {', '.join([f'{k}={v:.2f}' for k, v in weighted_scores.items()])}")
+                print(f"Changing heuristic from {old_heuristic_name} to {best_heuristic_name}")
             
             return new_heuristic
         return None
\ No newline at end of file
@@ -1,46 +1,267 @@
-import copy
+import cProfile
+import pstats
 import sys
+import time
 from game_state import ClobberGameState
 from heuristics import evaluate
 from decision_tree import DecisionTree
+from transposition import TranspositionTable
+from parallel import ParallelSearch
+from regions import RegionSolver
+from tablebase import Tablebase
+from ponder import Ponderer
+from mcts import MCTS
+from opening_book import OpeningBook
+from proof_number import ProofNumberSearch
 class ClobberAgent:
-    def __init__(self, name, initial_game_state, heuristic, strategy='minmax',max_depth=None, adaptive=False):
+    def __init__(self, name, initial_game_state, heuristic, strategy='minmax',max_depth=None, adaptive=False,
+                 tt_bytes=16 * 1024 * 1024, time_limit_ms=None, clock_ms=None, aspiration_window=None,
+                 batch_leaves=False, workers=1, reproducible=False, regions=False, tablebase_path=None,
+                 symmetric=False, quiet=False, on_move=None, profile=False, ponder=None, mcts_iterations=2000,
+                 mcts_batch=64, mcts_exploration=1.4, mcts_reuse=True, seed=None, book_path=None,
+                 solve_nodes=20000, record_writer=None, record_info=None):
+        """
+        time_limit_ms: think at most this long per move (iterative deepening, max_depth becomes a cap).
+        clock_ms: total thinking time for the whole game; every move gets a share of what is left.
+        aspiration_window: with strategy 'pvs' and a time budget, search each depth within +-aspiration_window
+        of the previous depth's value first (see DecisionTree).
+        batch_leaves: score minimax leaves in vectorised batches (see DecisionTree).
+        workers: with more than one worker the root moves are searched in a process pool
+        (see parallel.ParallelSearch); reproducible makes that search deterministic.
+        regions: solve late-game positions exactly by splitting them into independent regions
+        (see regions.RegionSolver); the solver's region values are kept for the whole game.
+        tablebase_path: a file written by tablebase.build_tablebase; it is memory-mapped once per process
+        and probed during the search.
+        symmetric: share transposition table entries between positions that are mirror images, rotations or
+        colour swaps of each other (needs a zero-sum heuristic that ignores the board's orientation).
+        quiet: print nothing; the per-move statistics are still kept in move_stats.
+        on_move: called with the statistics record of every move (see move_record).
+        profile: run every search under cProfile; profile_stats() returns the accumulated pstats.Stats.
+        ponder: 'predict' or 'all' to keep searching in a background thread after every move until the
+        opponent replies (see ponder.Ponderer); only useful when the opponent thinks in another process.
+        With strategy 'mcts' the move is chosen by UCT with batched random playouts (see mcts.MCTS):
+        mcts_iterations playouts per move, or as many as fit in the time budget when there is one;
+        mcts_batch playouts are run at once, mcts_reuse keeps the tree between turns and seed fixes the playouts.
+        book_path: a file written by opening_book.build_book; positions found in it are played from the book
+        without a search.
+        With strategy 'solve' every move starts with an exact proof-number search (see proof_number.ProofNumberSearch)
+        of at most solve_nodes nodes and the move's time budget; a proven win is played with a winning move,
+        otherwise the move comes from an alpha-beta search with the heuristic. The solver's table (tt_bytes)
+        is kept for the whole game and it uses the tablebase and region solver when they are enabled.
+        record_writer: a game_records.GameRecordWriter; the agent whose move ends the game appends the game to
+        it, so in a loop calling play() for both agents they can share one writer (protocol.play_match records
+        networked games itself). record_info: further append_game arguments of the record, e.g.
+        {"opening_plies": 4, "white": "alpha-beta/d3", "black": "mcts"}.
+        """
         self.name = name
         self.game_state = initial_game_state
         self.heuristic = heuristic
         self.strategy = strategy
         self.max_depth = max_depth
         self.adaptive = adaptive
+        self.transposition_table = TranspositionTable(max_bytes=tt_bytes)
+        self._table_heuristic = heuristic
+        self.time_limit_ms = time_limit_ms
+        self.clock_remaining_ms = clock_ms
+        self.aspiration_window = aspiration_window
+        self.batch_leaves = batch_leaves
+        self.parallel_search = (ParallelSearch(workers, reproducible, tt_bytes, regions, tablebase_path, symmetric,
+                                               batch_leaves) if workers > 1 else None)
+        self.region_solver = RegionSolver() if regions else None
+        self.tablebase = Tablebase.open(tablebase_path) if tablebase_path else None
+        self.symmetric = symmetric
+        self.num_of_visits = 0
+        self.quiet = quiet
+        self.on_move = on_move
+        self.move_stats = []
+        self.profiler = cProfile.Profile() if profile else None
+        if ponder and strategy in ('mcts', 'solve'):
+            raise ValueError(f"Pondering needs a heuristic search strategy, not '{strategy}'")
+        self.ponderer = Ponderer(self, ponder) if ponder else None
+        self.mcts_iterations = mcts_iterations
+        self.mcts = MCTS(mcts_exploration, mcts_batch, mcts_reuse, seed) if strategy == 'mcts' else None
+        self.book = OpeningBook.open(book_path) if book_path else None
+        self.solve_nodes = solve_nodes
+        self.record_writer = record_writer
+        self.record_info = record_info or {}
+        self.solver = (ProofNumberSearch(tt_bytes, exact_solvers=(self.tablebase, self.region_solver))
+                       if strategy == 'solve' else None)
+
+    def move_time_budget(self, game: ClobberGameState):
+        """
+        Return the time budget in ms for the next move, or None for a fixed-depth search.
+        With a game clock, the remaining time is split over an estimate of our remaining moves
+        (every move removes one piece, so both players together have at most that many moves left).
+        """
+        budget = self.time_limit_ms
+        if self.clock_remaining_ms is not None:
+            pieces = game.get_num_of_pieces('W') + game.get_num_of_pieces('B')
+            moves_left = max(4, pieces // 4)
+            share = max(1.0, self.clock_remaining_ms / moves_left)
+            budget = share if budget is None else min(budget, share)
+        return budget
+
+    def move_record(self, game, dt, best_move, heuristic_name, seconds):
+        """
+        Statistics of one move: nodes, cut-offs, transposition table probes and hits, positions solved
+        exactly, aspiration re-searches, effective branching factor (nodes ** (1 / depth) of the deepest
+        finished depth), per-depth timings, the heuristic used and the wall time.
+        """
+        depth = dt.depth_timings[-1]["depth"] if dt.depth_timings else self.max_depth
+        tt_stats = self.transposition_table.stats()
+        return {
+            "player": self.name,
+            "ply": game.ply,
+            "move": best_move,
+            "strategy": self.strategy,
+            "heuristic": heuristic_name,
+            "depth": depth,
+            "nodes": dt.num_of_visits,
+            "cutoffs": dt.num_of_cutoffs,
+            "tt_probes": tt_stats["probes"],
+            "tt_hits": tt_stats["hits"],
+            "tt_hit_rate": tt_stats["hit_rate"],
+            "solved": dt.num_of_solved,
+            "aspiration_researches": dt.aspiration_researches,
+            "ebf": dt.num_of_visits ** (1 / depth) if depth and dt.num_of_visits else 0.0,
+            "depth_timings": dt.depth_timings,
+            "seconds": seconds,
+            "ponder_hit": False,
+            "book_hit": False,
+        }
+
+    def profile_stats(self):
+        """
+        Return the pstats.Stats of all searches so far, or None without profile=True.
+        """
+        if self.profiler is None:
+            return None
+        return pstats.Stats(self.profiler)
 
     def play(self, game: ClobberGameState):
         """
         Play a move using the decision tree strategy.
         """
-        print(f"{self.name} is playing...")
-        print(f"Current board:\n{game.board}")
-        print(f"Current player: {game.current_player}")
-        print(f"Evaluating moves using {self.strategy} strategy...")
+        turn_start = time.perf_counter()
+        ponder_answer = self.ponderer.answer(game) if self.ponderer is not None else None
+        verbose = not self.quiet
+        if verbose:
+            print(f"{self.name} is playing...")
+            print(f"Current board:\n{game.board}")
+            print(f"Current player: {game.current_player}")
+            print(f"Evaluating moves using {self.strategy} strategy...")
 
-        dt=DecisionTree(self.max_depth, copy.deepcopy(game), self.heuristic, self.strategy, self.name)
+        if self.heuristic is not self._table_heuristic:
+            # stored values were computed with the previous heuristic
+            self.transposition_table.clear()
+            self._table_heuristic = self.heuristic
+        self.transposition_table.new_search()
+        self.transposition_table.reset_counters()
+        time_budget = self.move_time_budget(game)
+        strategy = 'alpha-beta' if self.strategy == 'solve' else self.strategy
+        dt=DecisionTree(self.max_depth, game, self.heuristic, strategy, self.name, self.transposition_table,
+                        time_limit_ms=time_budget, aspiration_window=self.aspiration_window,
+                        batch_leaves=self.batch_leaves,
+                        region_solver=self.region_solver, tablebase=self.tablebase,
+                        symmetric=self.symmetric, verbose=verbose)
 
-        if self.adaptive:
-            potential_new_heuristic = dt.analyze_and_change_heuristic(copy.deepcopy(game))
-            self.heuristic= potential_new_heuristic if potential_new_heuristic else self.heuristic
-        best_move = dt.get_best_move(copy.deepcopy(game))
-        print(f"Number of nodes visited: {dt.num_of_visits}", file=sys.stderr)
+        if self.profiler is not None:
+            self.profiler.enable()
+        try:
+            if self.adaptive:
+                potential_new_heuristic = dt.analyze_and_change_heuristic(game)
+                self.heuristic= potential_new_heuristic if potential_new_heuristic else self.heuristic
+            # a pondered answer counts if it was searched with this search's heuristic
+            if ponder_answer is not None and (self.ponderer.heuristic is not dt.heuristic or
+                                              self.parallel_search is not None):
+                ponder_answer = None
+            ponder_hit = (ponder_answer is not None and self.max_depth is not None
+                          and ponder_answer[0] >= self.max_depth)
+            book_move = self.book.move(game) if self.book is not None else None
+            solution = None
+            if book_move is not None:
+                best_move = book_move
+                ponder_hit = False
+            elif ponder_hit:
+                # the reply was pondered to full depth; its answer is the move the search would find
+                best_move = ponder_answer[1]
+            elif ponder_answer is not None and time_budget is not None:
+                # deepen from the pondered depth; the pondered move is played if no deeper search finishes
+                best_move = dt.get_best_move(game, known=ponder_answer)
+                ponder_hit = True
+            elif self.mcts is not None:
+                best_move = self.mcts.best_move(game, None if time_budget is not None else self.mcts_iterations,
+                                                time_budget)
+                dt.num_of_visits = self.mcts.iterations
+            elif self.solver is not None:
+                solution = self.solver.solve(game, self.solve_nodes, time_budget)
+                best_move = solution["move"]
+                if best_move is None:
+                    # lost or not solved within the budget: play the heuristic's choice
+                    remaining = None if time_budget is None else max(1.0, time_budget - solution["seconds"] * 1000)
+                    best_move = dt.get_best_move(game, remaining)
+                dt.num_of_visits += solution["nodes"]
+            elif self.parallel_search is not None:
+                best_move = self.parallel_search.best_move(game, dt.heuristic, self.strategy, self.name,
+                                                           self.max_depth, time_budget)
+                dt.num_of_visits = self.parallel_search.num_of_visits
+                dt.depth_timings = self.parallel_search.depth_timings
+            else:
+                best_move = dt.get_best_move(game)
+        finally:
+            if self.profiler is not None:
+                self.profiler.disable()
+        seconds = time.perf_counter() - turn_start
+        if self.clock_remaining_ms is not None:
+            self.clock_remaining_ms -= seconds * 1000
+        self.num_of_visits += dt.num_of_visits
+        # with adaptive, self.heuristic may already be the one chosen for the next move
+        record = self.move_record(game, dt, best_move, getattr(dt.heuristic, "__name__", repr(dt.heuristic)),
+                                  seconds)
+        record["ponder_hit"] = ponder_hit
+        record["book_hit"] = book_move is not None
+        if self.mcts is not None:
+            record["playouts"] = self.mcts.iterations
+            record["reused_visits"] = self.mcts.reused_visits
+            record["playouts_per_s"] = self.mcts.iterations / seconds if seconds else 0.0
+        if solution is not None:
+            record["solved_winner"] = solution["winner"]
+            record["solver_nodes"] = solution["nodes"]
+        self.move_stats.append(record)
+        if self.on_move is not None:
+            self.on_move(record)
+        if verbose:
+            if book_move is not None:
+                print(f"Book move {book_move}", file=sys.stderr)
+            print(f"Number of nodes visited: {dt.num_of_visits}", file=sys.stderr)
+            if self.mcts is not None:
+                print(f"MCTS: {record['playouts']} playouts ({record['reused_visits']} reused), "
+                      f"{record['playouts_per_s']:.0f} playouts/s", file=sys.stderr)
+            if solution is not None:
+                outcome = f"{solution['winner']} wins" if solution["winner"] else "not solved"
+                print(f"Solver: {outcome} ({solution['nodes']} nodes, {solution['seconds'] * 1000:.1f} ms)",
+                      file=sys.stderr)
+            for timing in dt.depth_timings:
+                print(f"Depth {timing['depth']}: {timing['seconds'] * 1000:.1f} ms, {timing['nodes']} nodes, "
+                      f"best {timing['move']}", file=sys.stderr)
+            print(f"Transposition table: {record['tt_hits']} hits, "
+                  f"{self.transposition_table.collisions} collisions", file=sys.stderr)
         if best_move:
             game.make_move(best_move)
-            print(f"{self.name} played move {best_move}")
-        else:
+            if verbose:
+                print(f"{self.name} played move {best_move}")
+            if self.ponderer is not None:
+                self.ponderer.start(game)
+        elif verbose:
             print(f"{self.name} has no valid moves. Game over.")
         winner = game.check_winner()
         if winner:
-            print(f"Winner: {winner}")
-            print(f"Final board:\n{game.board}")
+            if self.record_writer is not None:
+                self.record_writer.append_game(game, winner, **self.record_info)
+            if verbose:
+                print(f"Winner: {winner}")
+                print(f"Final board:\n{game.board}")
             return None
-        else:
+        elif verbose:
             print("No winner yet.")
         return game
-
-
-
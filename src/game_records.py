@@ -0,0 +1,265 @@
+import os
+import struct
+from collections import namedtuple
+import numpy as np
+from game_state import ClobberGameState
+from protocol import NO_MOVES
+
+MAGIC = b"CLGR"
+INDEX_MAGIC = b"CLGI"
+VERSION = 1
+# magic, version
+_HEADER = struct.Struct("<4sH")
+# rows, cols, winner, reason, opening plies, clock ms, increment ms, move count
+_GAME = struct.Struct("<BBBBBIIH")
+_NO_CLOCK = 0xFFFFFFFF
+_WINNERS = {None: 0, "W": 1, "B": 2}
+_WINNER_NAMES = {code: name for name, code in _WINNERS.items()}
+# one index entry per game, so games can be found and filtered without touching the record file
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("moves", "<u2"), ("rows", "u1"), ("cols", "u1"), ("winner", "u1"),
+                        ("reason", "u1")])
+
+GameRecord = namedtuple("GameRecord", ["rows", "cols", "winner", "reason", "opening_plies", "clock_ms",
+                                       "increment_ms", "white", "black", "moves"])
+
+# (row, col) step of the four move directions, in the order of their 2-bit codes
+_STEPS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+def _move_dtype(rows, cols):
+    """
+    Width of a packed move on the board: the start square times 4 plus the direction.
+    """
+    size = rows * cols * 4
+    return np.dtype("u1") if size <= 1 << 8 else np.dtype("<u2") if size <= 1 << 16 else np.dtype("<u4")
+
+
+def pack_moves(rows, cols, moves):
+    """
+    Pack moves ((r, c), (new_r, new_c)) into bytes, one (8x8 and smaller), two or four bytes per move.
+    """
+    codes = [((r * cols + c) << 2) | _STEPS.index((new_r - r, new_c - c)) for (r, c), (new_r, new_c) in moves]
+    return np.array(codes, dtype=_move_dtype(rows, cols)).tobytes()
+
+
+def unpack_moves(rows, cols, data):
+    """
+    Inverse of pack_moves.
+    """
+    codes = np.frombuffer(data, dtype=_move_dtype(rows, cols)).astype(np.int64)
+    squares, directions = codes >> 2, codes & 3
+    starts_r, starts_c = squares // cols, squares % cols
+    steps = np.array(_STEPS)[directions]
+    return [((r, c), (r + dr, c + dc)) for r, c, (dr, dc) in
+            zip(starts_r.tolist(), starts_c.tolist(), steps.tolist())]
+
+
+def _label(text):
+    """
+    Length-prefixed UTF-8 label, cut to at most 255 bytes on a character boundary.
+    """
+    data = text.encode()[:255].decode(errors="ignore").encode()
+    return bytes([len(data)]) + data
+
+
+def _index_path(path):
+    return path + ".idx"
+
+
+class GameRecordWriter:
+    """
+    Appends games to a record file and its index (path + ".idx"), creating both if needed.
+    A game is a small header (board size, result, opening plies, clock settings), the two player labels and
+    the packed moves, e.g. 57 bytes for a 40-move 8x8 game; its index entry is written after it, so a game
+    only counts once both are on disk. A run that was interrupted mid-game is cut back to its last indexed
+    game when the files are opened again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        index_path = _index_path(path)
+        count = _repair(path, index_path)
+        self.data = open(path, "ab")
+        self.index = open(index_path, "ab")
+        if self.data.tell() == 0:
+            self.data.write(_HEADER.pack(MAGIC, VERSION))
+        if self.index.tell() == 0:
+            self.index.write(_HEADER.pack(INDEX_MAGIC, VERSION))
+        self.count = count
+
+    def append(self, rows, cols, moves, winner=None, reason=NO_MOVES, opening_plies=0, clock_ms=None,
+               increment_ms=0, white="", black=""):
+        """
+        Append one game from the standard start position and return its index.
+        opening_plies: the number of leading moves that were not chosen by the players (random openings).
+        """
+        offset = self.data.tell()
+        clock = _NO_CLOCK if clock_ms is None else int(clock_ms)
+        self.data.write(_GAME.pack(rows, cols, _WINNERS[winner], reason, min(opening_plies, 255), clock,
+                                   int(increment_ms), len(moves)) +
+                        _label(white) + _label(black) + pack_moves(rows, cols, moves))
+        self.index.write(np.array([(offset, len(moves), rows, cols, _WINNERS[winner], reason)],
+                                  dtype=INDEX_DTYPE).tobytes())
+        self.count += 1
+        return self.count - 1
+
+    def append_game(self, game_state: ClobberGameState, winner=None, reason=NO_MOVES, opening_plies=0,
+                    clock_ms=None, increment_ms=0, white="", black=""):
+        """
+        Append the moves made on game_state (see ClobberGameState.move_history); the winner defaults to
+        the one of the final position.
+        """
+        if winner is None:
+            winner = game_state.check_winner()
+        return self.append(game_state.rows, game_state.cols, game_state.move_history(), winner, reason,
+                           opening_plies, clock_ms, increment_ms, white, black)
+
+    def flush(self):
+        self.data.flush()
+        self.index.flush()
+
+    def close(self):
+        self.flush()
+        self.data.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _record_end(f, entry):
+    """
+    End offset of the game of an index entry in the open record file, or None if the file is too short.
+    """
+    offset = int(entry["offset"]) + _GAME.size
+    for _ in range(2):
+        f.seek(offset)
+        length = f.read(1)
+        if not length:
+            return None
+        offset += 1 + length[0]
+    return offset + int(entry["moves"]) * _move_dtype(int(entry["rows"]), int(entry["cols"])).itemsize
+
+
+def _repair(path, index_path):
+    """
+    Cut the index back to whole entries of games that are complete in the record file, and the record file
+    back to the end of its last indexed game. Returns the number of games.
+    """
+    for file_path, magic in ((path, MAGIC), (index_path, INDEX_MAGIC)):
+        if os.path.exists(file_path) and os.path.getsize(file_path):
+            with open(file_path, "rb") as f:
+                if f.read(len(magic)) != magic:
+                    raise ValueError(f"{file_path} is not a Clobber game record file")
+    count = 0
+    if os.path.exists(index_path) and os.path.exists(path):
+        count = max(0, (os.path.getsize(index_path) - _HEADER.size) // INDEX_DTYPE.itemsize)
+    end = _HEADER.size
+    with open(index_path, "ab+") as index, open(path, "ab+") as data:
+        size = os.path.getsize(path)
+        while count:
+            index.seek(_HEADER.size + (count - 1) * INDEX_DTYPE.itemsize)
+            end = _record_end(data, np.frombuffer(index.read(INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)[0])
+            if end is not None and end <= size:
+                break
+            count -= 1
+            end = _HEADER.size
+        index.truncate(_HEADER.size + count * INDEX_DTYPE.itemsize if count else 0)
+        data.truncate(end if count else 0)
+    return count
+
+
+class GameRecords:
+    """
+    Read-only, memory-mapped view of a record file written by GameRecordWriter. Opening it maps both files
+    without reading them; a game is decoded only when it is accessed, so files with millions of games can be
+    filtered through the index (select) and sampled at random. Games appended after opening are not seen.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        index_path = _index_path(path)
+        with open(path, "rb") as f:
+            magic, version = _HEADER.unpack(f.read(_HEADER.size))
+        with open(index_path, "rb") as f:
+            index_magic, index_version = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != MAGIC or index_magic != INDEX_MAGIC or version != VERSION or index_version != VERSION:
+            raise ValueError(f"{path} is not a Clobber game record file (version {VERSION})")
+        self.count = (os.path.getsize(index_path) - _HEADER.size) // INDEX_DTYPE.itemsize
+        if self.count:
+            self.index = np.memmap(index_path, dtype=INDEX_DTYPE, mode="r", offset=_HEADER.size,
+                                   shape=(self.count,))
+            self.data = np.memmap(path, dtype=np.uint8, mode="r")
+        else:
+            self.index = np.zeros(0, dtype=INDEX_DTYPE)
+            self.data = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        """
+        Decode game i (negative indices count from the end) as a GameRecord.
+        """
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(f"game {i} out of range ({self.count} games)")
+        data = self.data
+        offset = int(self.index[i]["offset"])
+        rows, cols, winner, reason, opening_plies, clock_ms, increment_ms, count = _GAME.unpack(
+            data[offset:offset + _GAME.size].tobytes())
+        offset += _GAME.size
+        labels = []
+        for _ in range(2):
+            length = int(data[offset])
+            labels.append(data[offset + 1:offset + 1 + length].tobytes().decode())
+            offset += 1 + length
+        end = offset + count * _move_dtype(rows, cols).itemsize
+        return GameRecord(rows, cols, _WINNER_NAMES[winner], reason, opening_plies,
+                          None if clock_ms == _NO_CLOCK else clock_ms, increment_ms, labels[0], labels[1],
+                          unpack_moves(rows, cols, data[offset:end].tobytes()))
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def select(self, rows=None, cols=None, winner=None, min_moves=0):
+        """
+        Return the indices of the games matching all given conditions, read from the index only.
+        """
+        index = self.index
+        selected = index["moves"] >= min_moves
+        if rows is not None:
+            selected &= index["rows"] == rows
+        if cols is not None:
+            selected &= index["cols"] == cols
+        if winner is not None:
+            selected &= index["winner"] == _WINNERS[winner]
+        return np.flatnonzero(selected)
+
+    def replay(self, i, skip_opening=False):
+        """
+        Yield the positions of game i one at a time, from the start to the final position (after
+        the opening with skip_opening). The same ClobberGameState is advanced between yields; keep a
+        position with snapshot().
+        """
+        record = self[i]
+        game_state = ClobberGameState(record.rows, record.cols)
+        for ply, move in enumerate(record.moves):
+            if ply >= record.opening_plies or not skip_opening:
+                yield game_state
+            game_state.make_move(move)
+        yield game_state
+
+    def positions(self, indices=None, skip_opening=False):
+        """
+        Yield (game index, position) for every position of the given games (all by default), replaying
+        the games one after the other (see replay).
+        """
+        for i in range(self.count) if indices is None else indices:
+            for game_state in self.replay(int(i), skip_opening):
+                yield int(i), game_state
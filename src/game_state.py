@@ -1,11 +1,287 @@
+import copy
+import random
 import numpy as np
 
+_DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+_GEOMETRY_CACHE = {}
+
+
+def _geometry(rows, cols):
+    """
+    Return the per-size constants used by the bitboard code (shared between states).
+    """
+    key = (rows, cols)
+    if key not in _GEOMETRY_CACHE:
+        size = rows * cols
+        full = (1 << size) - 1
+        first_col = 0
+        for r in range(rows):
+            first_col |= 1 << (r * cols)
+        last_col = first_col << (cols - 1)
+        coords = [(i // cols, i % cols) for i in range(size)]
+        neighbour_masks = []
+        neighbours = []
+        # a move is identified by its rank, source square * 4 + direction, which sorts moves in board order
+        rank_moves = [None] * (size * 4)
+        pair_moves = {}
+        for i, (r, c) in enumerate(coords):
+            mask = 0
+            squares = []
+            for direction, (dr, dc) in enumerate(_DIRECTIONS):
+                if 0 <= r + dr < rows and 0 <= c + dc < cols:
+                    j = (r + dr) * cols + c + dc
+                    mask |= 1 << j
+                    squares.append(j)
+                    rank_moves[i * 4 + direction] = ((r, c), (r + dr, c + dc))
+                    # ranks of the capture from i to j and of the one from j to i
+                    pair_moves[i, j] = (i * 4 + direction, j * 4 + (direction ^ 1))
+            neighbour_masks.append(mask)
+            neighbours.append(squares)
+        rng = random.Random(f"clobber-zobrist-{rows}x{cols}")
+        base_w = [rng.getrandbits(64) for _ in range(size)]
+        base_b = [rng.getrandbits(64) for _ in range(size)]
+        symmetries = _symmetries(rows, cols)
+        # Every key holds two 64-bit lanes per board symmetry t. Lane t of the key of square i is the base key
+        # of the square t maps i to, so lane t of a position's hash is the hash of its image under t; lane
+        # count + t uses the base key of the other colour, so it is the hash of the colour-swapped image.
+        count = len(symmetries)
+        zobrist_w = []
+        zobrist_b = []
+        for i in range(size):
+            packed_w = packed_b = 0
+            for t, permutation in enumerate(symmetries):
+                j = permutation[i]
+                packed_w |= (base_w[j] << (64 * t)) | (base_b[j] << (64 * (count + t)))
+                packed_b |= (base_b[j] << (64 * t)) | (base_w[j] << (64 * (count + t)))
+            zobrist_w.append(packed_w)
+            zobrist_b.append(packed_b)
+        _GEOMETRY_CACHE[key] = {
+            "zobrist_w": zobrist_w,
+            "zobrist_b": zobrist_b,
+            "zobrist_side": rng.getrandbits(64),
+            "symmetries": symmetries,
+            "inverse_symmetries": [_inverse_symmetry(symmetries, t) for t in range(len(symmetries))],
+            "lane_shifts": [64 * t for t in range(count)],
+            "swapped_lane_shifts": [64 * (count + t) for t in range(count)],
+            "size": size,
+            "full": full,
+            "not_first_col": full & ~first_col,
+            "not_last_col": full & ~last_col,
+            "coords": coords,
+            "neighbour_masks": neighbour_masks,
+            "neighbours": neighbours,
+            "pair_moves": pair_moves,
+            "rank_moves": rank_moves,
+        }
+    return _GEOMETRY_CACHE[key]
+
+
+_LANE = (1 << 64) - 1
+
+
+def _symmetries(rows, cols):
+    """
+    Return the symmetries of a rows x cols board as square permutations (square i goes to permutation[i]),
+    identity first: the 8 symmetries of the square for square boards, the 4 of the rectangle otherwise.
+    """
+    transforms = [lambda r, c: (r, c), lambda r, c: (r, cols - 1 - c),
+                  lambda r, c: (rows - 1 - r, c), lambda r, c: (rows - 1 - r, cols - 1 - c)]
+    if rows == cols:
+        transforms += [lambda r, c: (c, r), lambda r, c: (c, rows - 1 - r),
+                       lambda r, c: (cols - 1 - c, r), lambda r, c: (cols - 1 - c, rows - 1 - r)]
+    symmetries = []
+    for transform in transforms:
+        permutation = []
+        for i in range(rows * cols):
+            r, c = transform(i // cols, i % cols)
+            permutation.append(r * cols + c)
+        symmetries.append(permutation)
+    return symmetries
+
+
+def _inverse_symmetry(symmetries, t):
+    inverse = [0] * len(symmetries[t])
+    for i, j in enumerate(symmetries[t]):
+        inverse[j] = i
+    return symmetries.index(inverse)
+
+
+def iter_bits(mask):
+    """
+    Yield the indices of the set bits of a mask in increasing order.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+if hasattr(int, "bit_count"):
+    popcount = int.bit_count
+else:
+    def popcount(mask):
+        return bin(mask).count("1")
+
+
+def neighbours_of(mask, rows, cols):
+    """
+    Return the mask of squares orthogonally adjacent to any square of the mask.
+    """
+    geo = _geometry(rows, cols)
+    return (((mask << cols) | (mask >> cols)
+             | ((mask & geo["not_last_col"]) << 1)
+             | ((mask & geo["not_first_col"]) >> 1)) & geo["full"])
+
+
+def connected_components(mask, rows, cols):
+    """
+    Split a mask into its orthogonally connected components (lowest square first).
+    """
+    geo = _geometry(rows, cols)
+    not_first_col, not_last_col = geo["not_first_col"], geo["not_last_col"]
+    components = []
+    while mask:
+        component = mask & -mask
+        while True:
+            grown = component | (((component << cols) | (component >> cols)
+                                  | ((component & not_last_col) << 1)
+                                  | ((component & not_first_col) >> 1)) & mask)
+            if grown == component:
+                break
+            component = grown
+        components.append(component)
+        mask &= ~component
+    return components
+
+
+def region_key(rows, cols, white, black, region):
+    """
+    Translation-independent key of the pieces inside region: (height, width, white bits, black bits)
+    with the bits laid out on the region's bounding box.
+    """
+    coords = _geometry(rows, cols)["coords"]
+    cells = [coords[i] for i in iter_bits(region)]
+    top = min(r for r, _ in cells)
+    left = min(c for _, c in cells)
+    height = max(r for r, _ in cells) - top + 1
+    width = max(c for _, c in cells) - left + 1
+    region_white = region_black = 0
+    for r, c in cells:
+        bit = 1 << (r * cols + c)
+        local = 1 << ((r - top) * width + c - left)
+        if white & bit:
+            region_white |= local
+        elif black & bit:
+            region_black |= local
+    return height, width, region_white, region_black
+
+
+def canonical_region_key(key):
+    """
+    Return (canonical key, swapped) for a region key: the smallest key over the 8 symmetries of the
+    bounding box, with and without swapping the colours, and whether the colours of the smallest were swapped.
+    """
+    height, width, white, black = key
+    cells = [(i // width, i % width, white >> i & 1) for i in iter_bits(white | black)]
+    best = None
+    for transposed in (False, True):
+        new_height, new_width = (width, height) if transposed else (height, width)
+        for flip_r in (False, True):
+            for flip_c in (False, True):
+                new_white = new_black = 0
+                for r, c, is_white in cells:
+                    if transposed:
+                        r, c = c, r
+                    if flip_r:
+                        r = new_height - 1 - r
+                    if flip_c:
+                        c = new_width - 1 - c
+                    bit = 1 << (r * new_width + c)
+                    if is_white:
+                        new_white |= bit
+                    else:
+                        new_black |= bit
+                for candidate in ((new_height, new_width, new_white, new_black, False),
+                                  (new_height, new_width, new_black, new_white, True)):
+                    if best is None or candidate < best:
+                        best = candidate
+    return best[:4], best[4]
+
+
+def masks_to_array(rows, cols, whites, blacks):
+    """
+    Convert lists of white and black masks into an int8 array of shape (N, rows, cols)
+    with 1 for white pieces, -1 for black pieces and 0 for empty squares.
+    """
+    size = rows * cols
+    nbytes = (size + 7) // 8 or 1
+
+    def unpack(masks):
+        raw = np.frombuffer(b"".join(mask.to_bytes(nbytes, 'little') for mask in masks), dtype=np.uint8)
+        return np.unpackbits(raw.reshape(len(masks), nbytes), axis=1, bitorder='little')[:, :size]
+
+    if not whites:
+        return np.zeros((0, rows, cols), dtype=np.int8)
+    boards = unpack(whites).astype(np.int8) - unpack(blacks).astype(np.int8)
+    return boards.reshape(len(whites), rows, cols)
+
+
 class ClobberGameState:
+    """
+    Clobber position stored as two bitboards (one integer mask per colour).
+    Bit r * cols + c is set when the square (r, c) holds a piece of that colour.
+    The heuristic features (piece counts, attack edges, isolated pieces) and the legal moves of both
+    colours are kept up to date by make_move / unmake_move, which only look at the squares around the
+    two that changed; set debug_features to check them against a full scan after every move.
+    """
+    debug_features = False
+
     def __init__(self, rows, cols):
         self.rows = rows
         self.cols = cols
-        self.board = self.create_clobber_board(rows, cols)
+        self._geo = _geometry(rows, cols)
+        self.white = 0
+        self.black = 0
+        for r in range(rows):
+            for c in range(cols):
+                if (r + c) % 2 == 0:
+                    self.white |= 1 << (r * cols + c)
+                else:
+                    self.black |= 1 << (r * cols + c)
         self.current_player = 'W'
+        self._piece_hash = self._compute_piece_hash()
+        self.features = self.scan_features()
+        self._moves = self.scan_moves()
+        self._history = []
+        self._board_view = None
+
+    def __deepcopy__(self, memo):
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        clone._history = list(self._history)
+        clone._moves = {player: dict(moves) for player, moves in self._moves.items()}
+        clone._board_view = None
+        return clone
+
+    def snapshot(self):
+        """
+        Return a copy of the position without the undo history (cheap to pickle).
+        """
+        clone = copy.deepcopy(self)
+        clone._history = []
+        return clone
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_geo"]
+        del state["_moves"]
+        state["_board_view"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._geo = _geometry(self.rows, self.cols)
+        self._moves = self.scan_moves()
 
     def create_clobber_board(self, rows, cols):
         board = np.empty((rows, cols), dtype=str)
@@ -13,44 +289,481 @@ class ClobberGameState:
             for c in range(cols):
                 board[r, c] = 'W' if (r + c) % 2 == 0 else 'B'
         return board
-    
-    def get_possible_moves(self, print_moves=False):
+
+    @property
+    def board(self):
         """
-        Get all possible moves for the current player.
+        Read-only NumPy view of the position ('W', 'B' and '_' cells), rebuilt lazily after moves.
         """
-        moves = []
+        if self._board_view is None:
+            size = self._geo["size"]
+            nbytes = (size + 7) // 8 or 1
+            view = np.full(size, '_', dtype=str)
+            for mask, piece in ((self.white, 'W'), (self.black, 'B')):
+                bits = np.unpackbits(np.frombuffer(mask.to_bytes(nbytes, 'little'), dtype=np.uint8),
+                                     bitorder='little')[:size]
+                view[bits.astype(bool)] = piece
+            view = view.reshape(self.rows, self.cols)
+            view.flags.writeable = False
+            self._board_view = view
+        return self._board_view
+
+    @board.setter
+    def board(self, board):
+        """
+        Load a position from a 2D array of 'W', 'B' and '_' cells.
+        """
+        board = np.asarray(board)
+        if board.shape != (self.rows, self.cols):
+            raise ValueError(f"Board shape {board.shape} does not match {self.rows}x{self.cols}")
+        self.white = self.black = 0
         for r in range(self.rows):
             for c in range(self.cols):
-                if self.board[r, c] == self.current_player:
-                    for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                        new_r, new_c = r + dr, c + dc
-                        if 0 <= new_r < self.rows and 0 <= new_c < self.cols:
-                            if self.board[new_r, new_c] != self.current_player and self.board[new_r, new_c] != '_':
-                                moves.append(((r, c), (new_r, new_c)))
-                                if print_moves:
-                                    print("Possible move:", self.board[r, c], "to", self.board[new_r, new_c])
+                if board[r, c] == 'W':
+                    self.white |= 1 << (r * self.cols + c)
+                elif board[r, c] == 'B':
+                    self.black |= 1 << (r * self.cols + c)
+        self._piece_hash = self._compute_piece_hash()
+        self.features = self.scan_features()
+        self._moves = self.scan_moves()
+        self._board_view = None
+
+    def _compute_piece_hash(self):
+        geo = self._geo
+        piece_hash = 0
+        for i in iter_bits(self.white):
+            piece_hash ^= geo["zobrist_w"][i]
+        for i in iter_bits(self.black):
+            piece_hash ^= geo["zobrist_b"][i]
+        return piece_hash
+
+    @property
+    def zobrist(self):
+        """
+        64-bit Zobrist key of the position and the side to move, maintained incrementally by make_move.
+        """
+        if self.current_player == 'B':
+            return (self._piece_hash & _LANE) ^ self._geo["zobrist_side"]
+        return self._piece_hash & _LANE
+
+    def canonical_key(self):
+        """
+        Return (key, transform, swapped): the smallest hash over the board symmetries of the position with
+        white to move, the index of the symmetry that maps the position to that canonical image, and whether
+        the colours were swapped first (black to move). Symmetric positions share the key;
+        use transform_move to map moves to and from the canonical image.
+        """
+        swapped = self.current_player == 'B'
+        lanes = self._lanes(self._piece_hash, swapped)
+        key = min(lanes)
+        return key, lanes.index(key), swapped
+
+    def _lanes(self, piece_hash, swapped):
+        shifts = self._geo["swapped_lane_shifts" if swapped else "lane_shifts"]
+        return [(piece_hash >> shift) & _LANE for shift in shifts]
+
+    def transform_move(self, move, transform, inverse=False):
+        """
+        Map a move through a board symmetry (or its inverse); None stays None.
+        """
+        if move is None:
+            return None
+        geo = self._geo
+        if inverse:
+            transform = geo["inverse_symmetries"][transform]
+        permutation = geo["symmetries"][transform]
+        coords = geo["coords"]
+        (r, c), (new_r, new_c) = move
+        return coords[permutation[r * self.cols + c]], coords[permutation[new_r * self.cols + new_c]]
+
+    @property
+    def ply(self):
+        """
+        Number of moves on the undo stack.
+        """
+        return len(self._history)
+
+    def move_history(self):
+        """
+        Return the moves made on this state, oldest first, recovered from the undo history
+        (moves made before a snapshot() are not included).
+        """
+        coords = self._geo["coords"]
+        positions = [(white, black, player) for white, black, player, *_ in self._history]
+        positions.append((self.white, self.black, self.current_player))
+        moves = []
+        for (white, black, player), (next_white, next_black, _) in zip(positions, positions[1:]):
+            before, after = (white, next_white) if player == 'W' else (black, next_black)
+            moves.append((coords[(before & ~after).bit_length() - 1], coords[(after & ~before).bit_length() - 1]))
         return moves
-    
+
+    def board_key(self):
+        """
+        Return a hashable key identifying the position and the side to move.
+        """
+        return (self.white, self.black, self.current_player)
+
+    def _masks(self, player):
+        """
+        Return (own, opponent) masks for the given player.
+        """
+        if player == 'W':
+            return self.white, self.black
+        return self.black, self.white
+
+    def _attack_sources(self, own, opp):
+        """
+        Return the masks of own pieces that can capture in each of the four directions
+        (up, down, left, right), in the same order as _DIRECTIONS.
+        """
+        cols = self.cols
+        geo = self._geo
+        up = own & (opp << cols)
+        down = own & (opp >> cols)
+        left = own & ((opp & geo["not_last_col"]) << 1)
+        right = own & ((opp & geo["not_first_col"]) >> 1)
+        return up, down, left, right
+
+    def scan_moves(self):
+        """
+        Find the legal moves of both colours from scratch: {player: dict mapping the rank of every move
+        (source square * 4 + direction) to the move}, in board order.
+        """
+        rank_moves = self._geo["rank_moves"]
+        moves = {}
+        for player in ('W', 'B'):
+            up, down, left, right = self._attack_sources(*self._masks(player))
+            found = []
+            for i in iter_bits(up | down | left | right):
+                bit = 1 << i
+                for direction, sources in enumerate((up, down, left, right)):
+                    if sources & bit:
+                        found.append(i * 4 + direction)
+            moves[player] = {rank: rank_moves[rank] for rank in found}
+        return moves
+
+    def get_possible_moves(self, print_moves=False, ordered=True):
+        """
+        Get all possible moves for the current player from the incrementally maintained move set, in board
+        order (source square, then direction), so the order never depends on the moves made and unmade before.
+        ordered=False skips the sort and returns them in move set order, which depends on that history;
+        the searches use it below the root, where they order the moves themselves.
+        """
+        moves = self._moves[self.current_player]
+        moves = list(map(moves.__getitem__, sorted(moves))) if ordered else list(moves.values())
+        if print_moves:
+            opponent = 'B' if self.current_player == 'W' else 'W'
+            for _ in moves:
+                print("Possible move:", self.current_player, "to", opponent)
+        return moves
+
+    def encoded_board(self):
+        """
+        Return the position as an int8 array (1 white, -1 black, 0 empty).
+        """
+        return masks_to_array(self.rows, self.cols, [self.white], [self.black])[0]
+
+    def child_positions(self):
+        """
+        Return (moves, whites, blacks): the legal moves and the masks of the positions they lead to,
+        computed without touching this state.
+        """
+        moves = self.get_possible_moves()
+        cols = self.cols
+        whites, blacks = [], []
+        for (start_r, start_c), (end_r, end_c) in moves:
+            start = 1 << (start_r * cols + start_c)
+            end = 1 << (end_r * cols + end_c)
+            if self.current_player == 'W':
+                whites.append((self.white ^ start) | end)
+                blacks.append(self.black & ~end)
+            else:
+                blacks.append((self.black ^ start) | end)
+                whites.append(self.white & ~end)
+        return moves, whites, blacks
+
+    def child_key(self, move, symmetric=False):
+        """
+        Return (key, captures) of the position a legal move leads to, computed without making it:
+        its Zobrist key (the first element of its canonical_key() with symmetric) and the number of
+        captures of the player to move there.
+        """
+        geo = self._geo
+        cols = self.cols
+        (start_r, start_c), (end_r, end_c) = move
+        start_i = start_r * cols + start_c
+        end_i = end_r * cols + end_c
+        if self.current_player == 'W':
+            own, opp = self.white, self.black
+            piece_hash = (self._piece_hash ^ geo["zobrist_w"][start_i] ^ geo["zobrist_w"][end_i]
+                          ^ geo["zobrist_b"][end_i])
+            opponent = 'B'
+        else:
+            own, opp = self.black, self.white
+            piece_hash = (self._piece_hash ^ geo["zobrist_b"][start_i] ^ geo["zobrist_b"][end_i]
+                          ^ geo["zobrist_w"][end_i])
+            opponent = 'W'
+        # the opponent's captures lost and gained around the two squares, as in make_move
+        neighbours = geo["neighbours"]
+        captures = len(self._moves[opponent])
+        for n in neighbours[start_i]:
+            captures -= opp >> n & 1
+        for n in neighbours[end_i]:
+            if n != start_i:
+                captures += (opp >> n & 1) - (own >> n & 1)
+        if symmetric:
+            return min(self._lanes(piece_hash, opponent == 'B')), captures
+        if opponent == 'B':
+            return (piece_hash & _LANE) ^ geo["zobrist_side"], captures
+        return piece_hash & _LANE, captures
+
+    def regions(self):
+        """
+        Return the masks of the orthogonally connected groups of pieces. Pieces in different groups
+        can never interact again, so the position is the sum of independent games on these regions.
+        """
+        return connected_components(self.white | self.black, self.rows, self.cols)
+
+    def live_regions(self):
+        """
+        Return the regions that still hold pieces of both colours; the others have no moves for anyone.
+        """
+        return [region for region in self.regions() if region & self.white and region & self.black]
+
+    def region_key(self, region):
+        return region_key(self.rows, self.cols, self.white, self.black, region)
+
+    def live_mask(self):
+        """
+        Return the mask of the pieces in live regions, grown through the occupied squares from the pieces
+        that touch an opponent piece (without splitting the position into regions).
+        """
+        white, black = self.white, self.black
+        occupied = white | black
+        live = (white & self._neighbours(black)) | (black & self._neighbours(white))
+        while True:
+            grown = live | (self._neighbours(live) & occupied)
+            if grown == live:
+                return live
+            live = grown
+
+    def count_live_pieces(self, player):
+        """
+        Count the player's pieces in live regions; the others can never move or be captured again.
+        """
+        return popcount(self.live_mask() & (self.white if player == 'W' else self.black))
+
+    def _neighbours(self, mask):
+        """
+        Return the mask of squares orthogonally adjacent to any square of the mask.
+        """
+        geo = self._geo
+        cols = self.cols
+        return (((mask << cols) | (mask >> cols)
+                 | ((mask & geo["not_last_col"]) << 1)
+                 | ((mask & geo["not_first_col"]) >> 1)) & geo["full"])
+
+    def adjacent_count(self, square, player):
+        """
+        Count the player's pieces orthogonally adjacent to square (r, c).
+        """
+        r, c = square
+        own, _ = self._masks(player)
+        return popcount(self._geo["neighbour_masks"][r * self.cols + c] & own)
+
+    def scan_features(self):
+        """
+        Compute the heuristic features from scratch:
+        (white pieces, black pieces, white-black attack edges, isolated white, isolated black).
+        Every attack edge is a capture for both sides, so it is the mobility of either colour.
+        """
+        cols = self.cols
+        geo = self._geo
+        white, black = self.white, self.black
+        edges = (popcount(white & (black << cols)) + popcount(white & (black >> cols)) +
+                 popcount(white & ((black & geo["not_last_col"]) << 1)) +
+                 popcount(white & ((black & geo["not_first_col"]) >> 1)))
+        lonely = ~self._neighbours(white | black)
+        return (popcount(white), popcount(black), edges, popcount(white & lonely), popcount(black & lonely))
+
+    def reference_features(self):
+        """
+        Compute the heuristic features square by square on the board, the way the heuristics did before
+        the bitboards, as an independent reference for check_features. Attacks are counted per colour.
+        """
+        board = self.board
+
+        def is_isolated(x, y):
+            for dx, dy in _DIRECTIONS:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < self.rows and 0 <= ny < self.cols:
+                    if board[nx][ny] in ('B', 'W'):
+                        return False
+            return True
+
+        pieces = {'W': 0, 'B': 0}
+        attacks = {'W': 0, 'B': 0}
+        isolated = {'W': 0, 'B': 0}
+        for x in range(self.rows):
+            for y in range(self.cols):
+                piece = board[x][y]
+                if piece not in ('W', 'B'):
+                    continue
+                pieces[piece] += 1
+                if is_isolated(x, y):
+                    isolated[piece] += 1
+                for dx, dy in _DIRECTIONS:
+                    nx, ny = x + dx, y + dy
+                    if 0 <= nx < self.rows and 0 <= ny < self.cols:
+                        if board[nx][ny] == ('B' if piece == 'W' else 'W'):
+                            attacks[piece] += 1
+        if attacks['W'] != attacks['B']:
+            raise AssertionError(f"White has {attacks['W']} captures but black has {attacks['B']}")
+        return pieces['W'], pieces['B'], attacks['W'], isolated['W'], isolated['B']
+
+    def check_features(self):
+        """
+        Raise AssertionError if the incrementally maintained features differ from the square by square
+        reference (see reference_features) or the moves from a full scan.
+        """
+        scanned = self.reference_features()
+        if self.features != scanned:
+            raise AssertionError(f"Incremental features {self.features} differ from full scan {scanned}")
+        for player, moves in self.scan_moves().items():
+            if set(self._moves[player]) != set(moves):
+                raise AssertionError(f"Incremental moves of {player} differ from full scan")
+
+    def _isolated_within(self, region):
+        lonely = region & ~self._neighbours(self.white | self.black)
+        return popcount(lonely & self.white), popcount(lonely & self.black)
+
+    def count_attacks(self, player):
+        """
+        Count the (piece, adjacent opponent piece) pairs of a player, i.e. its number of captures.
+        """
+        return self.features[2]
+
+    def count_isolated(self, player):
+        """
+        Count the player's pieces that have no orthogonal neighbour of either colour.
+        """
+        return self.features[3] if player == 'W' else self.features[4]
+
+    def has_moves(self, player=None):
+        """
+        Check whether the player (current player by default) has any capture available.
+        """
+        return bool(self._moves[player or self.current_player])
+
+    def count_moves(self, player=None):
+        """
+        Count the captures available to the player (current player by default), in O(1) from the move set.
+        """
+        return len(self._moves[player or self.current_player])
+
     def make_move(self, move):
         """
         Make a move on the board.
         """
         (start_r, start_c), (end_r, end_c) = move
-        if self.board[start_r, start_c] != self.current_player:
+        if not (0 <= start_r < self.rows and 0 <= start_c < self.cols and 0 <= end_r < self.rows
+                and 0 <= end_c < self.cols):
+            raise ValueError("Invalid move: off the board")
+        if abs(start_r - end_r) + abs(start_c - end_c) != 1:
+            raise ValueError("Invalid move: must capture an orthogonally adjacent piece")
+        start_i = start_r * self.cols + start_c
+        end_i = end_r * self.cols + end_c
+        start = 1 << start_i
+        end = 1 << end_i
+        own, opp = self._masks(self.current_player)
+        if not own & start:
             raise ValueError("Invalid move: not the current player's piece")
-        if self.board[end_r, end_c] == self.current_player:
+        if own & end:
             raise ValueError("Invalid move: cannot move to the same color")
-        self.board[end_r, end_c] = self.current_player
-        self.board[start_r, start_c] = '_'
-        self.current_player = 'B' if self.current_player == 'W' else 'W'
+        if not opp & end:
+            raise ValueError("Invalid move: must capture an opponent's piece")
+        geo = self._geo
+        neighbours = geo["neighbours"]
+        pair_moves = geo["pair_moves"]
+        rank_moves = geo["rank_moves"]
+        mover = self.current_player
+        mover_moves = self._moves[mover]
+        other_moves = self._moves['B' if mover == 'W' else 'W']
+        # captures (mover's square, opponent's square) that disappear: every one touching either square
+        removed = [(start_i, n) for n in neighbours[start_i] if opp >> n & 1]
+        removed += [(n, end_i) for n in neighbours[end_i] if n != start_i and own >> n & 1]
+        for pair in removed:
+            ours, theirs = pair_moves[pair]
+            del mover_moves[ours]
+            del other_moves[theirs]
+        # and the ones the moved piece makes on its new square
+        added = [(end_i, n) for n in neighbours[end_i] if opp >> n & 1]
+        for pair in added:
+            ours, theirs = pair_moves[pair]
+            mover_moves[ours] = rank_moves[ours]
+            other_moves[theirs] = rank_moves[theirs]
+        self._history.append((self.white, self.black, self.current_player, self._piece_hash, self.features,
+                              removed, added))
+        region = start | end | geo["neighbour_masks"][start_i] | geo["neighbour_masks"][end_i]
+        white_iso_before, black_iso_before = self._isolated_within(region)
+        white_pieces, black_pieces, _, white_iso, black_iso = self.features
+        if self.current_player == 'W':
+            self._piece_hash ^= geo["zobrist_w"][start_i] ^ geo["zobrist_w"][end_i]
+            if self.black & end:
+                self._piece_hash ^= geo["zobrist_b"][end_i]
+                black_pieces -= 1
+            self.white = (self.white ^ start) | end
+            self.black &= ~end
+            self.current_player = 'B'
+        else:
+            self._piece_hash ^= geo["zobrist_b"][start_i] ^ geo["zobrist_b"][end_i]
+            if self.white & end:
+                self._piece_hash ^= geo["zobrist_w"][end_i]
+                white_pieces -= 1
+            self.black = (self.black ^ start) | end
+            self.white &= ~end
+            self.current_player = 'W'
+        white_iso_after, black_iso_after = self._isolated_within(region)
+        self.features = (white_pieces, black_pieces,
+                         len(mover_moves),
+                         white_iso + white_iso_after - white_iso_before,
+                         black_iso + black_iso_after - black_iso_before)
+        self._board_view = None
+        if self.debug_features:
+            self.check_features()
+        return self
+
+    def unmake_move(self):
+        """
+        Undo the last move made with make_move.
+        """
+        if not self._history:
+            raise ValueError("Invalid unmake: no move to undo")
+        (self.white, self.black, self.current_player, self._piece_hash, self.features,
+         removed, added) = self._history.pop()
+        pair_moves = self._geo["pair_moves"]
+        rank_moves = self._geo["rank_moves"]
+        mover_moves = self._moves[self.current_player]
+        other_moves = self._moves['B' if self.current_player == 'W' else 'W']
+        for pair in added:
+            ours, theirs = pair_moves[pair]
+            del mover_moves[ours]
+            del other_moves[theirs]
+        for pair in removed:
+            ours, theirs = pair_moves[pair]
+            mover_moves[ours] = rank_moves[ours]
+            other_moves[theirs] = rank_moves[theirs]
+        self._board_view = None
+        if self.debug_features:
+            self.check_features()
         return self
-    
+
     def is_game_over(self):
         """
-        Check if the game is over.
+        Check if the game is over (the player to move has no capture), in O(1) from the move set.
         """
-        return self.get_possible_moves() == []
-    
+        return not self._moves[self.current_player]
+
     def check_winner(self):
         if self.is_game_over():
             if self.current_player == 'W':
@@ -58,9 +771,9 @@ class ClobberGameState:
             else:
                 return 'W'
         return None
-    
+
     def get_num_of_pieces(self, player):
         """
         Get the number of pieces for a player.
         """
-        return np.sum(self.board == player)
+        return self.features[0] if player == 'W' else self.features[1]
@@ -0,0 +1,127 @@
+import copy
+import sys
+from collections import deque
+from game_state import ClobberGameState
+
+
+class TreeNode:
+    """
+    Node of an explicit game tree. Children are created only when the node is expanded.
+    """
+    __slots__ = ("move", "parent", "depth", "children", "winner", "value")
+
+    def __init__(self, move=None, parent=None):
+        self.move = move
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent else 0
+        self.children = None
+        self.winner = None
+        self.value = None
+
+    def is_expanded(self):
+        return self.children is not None
+
+    def path(self):
+        """
+        Return the list of moves leading from the root to this node.
+        """
+        moves = []
+        node = self
+        while node.parent is not None:
+            moves.append(node.move)
+            node = node.parent
+        moves.reverse()
+        return moves
+
+
+class GameTree:
+    """
+    Lazily expanded game tree for analysis and visualisation.
+    Nodes are only created by expand(), which stops once the node or memory budget is used up.
+    """
+
+    def __init__(self, game_state: ClobberGameState, max_nodes=None, max_bytes=None):
+        self.state = copy.deepcopy(game_state)
+        self.max_nodes = max_nodes
+        self.max_bytes = max_bytes
+        self.root = TreeNode()
+        self.num_of_nodes = 1
+        self.approx_bytes = self._node_bytes(self.root)
+
+    @staticmethod
+    def _node_bytes(node):
+        return sys.getsizeof(node) + sys.getsizeof(node.move)
+
+    def budget_exhausted(self):
+        if self.max_nodes is not None and self.num_of_nodes >= self.max_nodes:
+            return True
+        if self.max_bytes is not None and self.approx_bytes >= self.max_bytes:
+            return True
+        return False
+
+    def expand(self, node: TreeNode):
+        """
+        Create the children of a node. Returns False if the budget does not allow it.
+        """
+        if node.is_expanded():
+            return True
+        path = node.path()
+        for move in path:
+            self.state.make_move(move)
+        try:
+            moves = self.state.get_possible_moves()
+            if self.max_nodes is not None and self.num_of_nodes + len(moves) > self.max_nodes:
+                return False
+            if self.budget_exhausted():
+                return False
+            if not moves:
+                node.winner = self.state.check_winner()
+            node.children = {}
+            for move in moves:
+                child = TreeNode(move, node)
+                node.children[move] = child
+                self.approx_bytes += self._node_bytes(child)
+            self.num_of_nodes += len(moves)
+            self.approx_bytes += sys.getsizeof(node.children)
+            return True
+        finally:
+            for _ in path:
+                self.state.unmake_move()
+
+    def expand_to_depth(self, depth):
+        """
+        Expand the tree breadth-first down to the given depth or until the budget runs out.
+        Returns True if the whole requested depth was expanded.
+        """
+        queue = deque([self.root])
+        while queue:
+            node = queue.popleft()
+            if node.depth >= depth:
+                continue
+            if not self.expand(node):
+                return False
+            queue.extend(node.children.values())
+        return True
+
+    def walk(self, moves):
+        """
+        Follow a sequence of moves from the root, expanding nodes on the way.
+        """
+        node = self.root
+        for move in moves:
+            if not self.expand(node) or move not in node.children:
+                raise ValueError(f"Invalid path: move {move} is not available")
+            node = node.children[move]
+        return node
+
+    def to_dict(self, node=None):
+        """
+        Return the expanded part of the tree as nested dicts {move: subtree}.
+        Unexpanded nodes are None and finished games hold the winner, as in the old eager tree.
+        """
+        node = node or self.root
+        if not node.is_expanded():
+            return None
+        if not node.children:
+            return node.winner
+        return {move: self.to_dict(child) for move, child in node.children.items()}
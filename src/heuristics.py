@@ -1,93 +1,80 @@
-from game_state import ClobberGameState
+import json
+import sys
+import numpy as np
+from game_state import ClobberGameState, popcount
+
+# weights of evaluate(), replaced in place by load_weights()
+EVALUATE_WEIGHTS = {"mobility": 10, "pieces": 20, "isolation": 15}
+# (game progress below which the phase applies, weights of the heuristics compared by
+# DecisionTree.analyze_and_change_heuristic), replaced in place by load_weights()
+PHASES = [
+    (0.3, {"mobility": 0.7, "piece_count": 0.2, "isolation": 0.1}),
+    (0.7, {"mobility": 0.4, "piece_count": 0.4, "isolation": 0.2}),
+    (float('inf'), {"mobility": 0.2, "piece_count": 0.3, "isolation": 0.5}),
+]
+
+
+def load_weights(path):
+    """
+    Load a weight set written by tuning.save_weights into EVALUATE_WEIGHTS and PHASES.
+    Both copies of this module are updated when it was imported as heuristics and as src.heuristics.
+    """
+    with open(path) as f:
+        weights = json.load(f)
+    phases = [(phase["until"] if phase["until"] is not None else float('inf'), phase["weights"])
+              for phase in weights["phases"]]
+    for name in ("heuristics", "src.heuristics"):
+        module = sys.modules.get(name)
+        if module is not None:
+            module.EVALUATE_WEIGHTS.update(weights["evaluate"])
+            module.PHASES[:] = phases
+    return weights
 
 
 def evaluate(game_state : ClobberGameState, player):
     opponent = 'B' if player == 'W' else 'W'
-    
-    def is_isolated(x, y):
-        for dx, dy in [(-1,0), (1,0), (0,-1), (0,1)]:
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < len(game_state.board) and 0 <= ny < len(game_state.board[0]):
-                if game_state.board[nx][ny] in ('B', 'W'):
-                    return False
-        return True
-
-    my_pieces = opp_pieces = my_moves = opp_moves = my_isolated = opp_isolated = 0
-    for x in range(len(game_state.board)):
-        for y in range(len(game_state.board[0])):
-            piece = game_state.board[x][y]
-            if piece == player:
-                my_pieces += 1
-                if is_isolated(x, y): my_isolated += 1
-                for dx, dy in [(-1,0), (1,0), (0,-1), (0,1)]:
-                    nx, ny = x + dx, y + dy
-                    if 0 <= nx < len(game_state.board) and 0 <= ny < len(game_state.board[0]):
-                        if game_state.board[nx][ny] == opponent:
-                            my_moves += 1
-            elif piece == opponent:
-                opp_pieces += 1
-                if is_isolated(x, y): opp_isolated += 1
-                for dx, dy in [(-1,0), (1,0), (0,-1), (0,1)]:
-                    nx, ny = x + dx, y + dy
-                    if 0 <= nx < len(game_state.board) and 0 <= ny < len(game_state.board[0]):
-                        if game_state.board[nx][ny] == player:
-                            opp_moves += 1
 
+    my_pieces = game_state.get_num_of_pieces(player)
+    opp_pieces = game_state.get_num_of_pieces(opponent)
+    my_moves = game_state.count_attacks(player)
+    opp_moves = game_state.count_attacks(opponent)
+    my_isolated = game_state.count_isolated(player)
+    opp_isolated = game_state.count_isolated(opponent)
+
+    weights = EVALUATE_WEIGHTS
     score = (
-        10 * (my_moves - opp_moves) +
-        20 * (my_pieces - opp_pieces) +
-        15 * (opp_isolated - my_isolated)
+        weights["mobility"] * (my_moves - opp_moves) +
+        weights["pieces"] * (my_pieces - opp_pieces) +
+        weights["isolation"] * (opp_isolated - my_isolated)
     )
     return score
 
+def live_evaluate(game_state: ClobberGameState, player):
+    """
+    evaluate() on the live regions only: pieces in dead regions (one colour only, isolated pieces included)
+    can never move or be captured again, so they are not counted, and the isolation term is dropped.
+    """
+    opponent = 'B' if player == 'W' else 'W'
+    live = game_state.live_mask()
+    mine, theirs = (game_state.white, game_state.black) if player == 'W' else (game_state.black, game_state.white)
+    my_moves = game_state.count_attacks(player)
+    opp_moves = game_state.count_attacks(opponent)
+
+    weights = EVALUATE_WEIGHTS
+    return (weights["mobility"] * (my_moves - opp_moves) +
+            weights["pieces"] * (popcount(live & mine) - popcount(live & theirs)))
+
 def mobility_score(game_state: ClobberGameState, player):
     opponent = 'B' if player == 'W' else 'W'
-    def count_moves(p):
-        moves = 0
-        for x in range(len(game_state.board)):
-            for y in range(len(game_state.board[0])):
-                if game_state.board[x][y] == p:
-                    for dx, dy in [(-1,0), (1,0), (0,-1), (0,1)]:
-                        nx, ny = x + dx, y + dy
-                        if 0 <= nx < len(game_state.board) and 0 <= ny < len(game_state.board[0]):
-                            if game_state.board[nx][ny] == ('B' if p == 'W' else 'W'):
-                                moves += 1
-        return moves
-    return count_moves(player) - count_moves(opponent)
+    return game_state.count_attacks(player) - game_state.count_attacks(opponent)
 
 def piece_count_score(game_state: ClobberGameState, player):
     opponent = 'B' if player == 'W' else 'W'
-    my_count= 0
-    opp_count= 0
-    for x in range(len(game_state.board)):
-        for y in range(len(game_state.board[0])):
-            piece = game_state.board[x][y]
-            if piece == player:
-                my_count += 1
-            elif piece == opponent:
-                opp_count += 1
-    return my_count - opp_count
+    return game_state.get_num_of_pieces(player) - game_state.get_num_of_pieces(opponent)
 
 def isolation_score(game_state: ClobberGameState, player):
     opponent = 'B' if player == 'W' else 'W'
-    
-    def is_isolated(x, y):
-        for dx, dy in [(-1,0), (1,0), (0,-1), (0,1)]:
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < len(game_state.board) and 0 <= ny < len(game_state.board[0]):
-                if game_state.board[nx][ny] in ('B', 'W'):
-                    return False
-        return True
-
-    def count_isolated(p):
-        count = 0
-        for x in range(len(game_state.board)):
-            for y in range(len(game_state.board[0])):
-                if game_state.board[x][y] == p and is_isolated(x, y):
-                    count += 1
-        return count
-
-    return count_isolated(opponent) - count_isolated(player)
+    return game_state.count_isolated(opponent) - game_state.count_isolated(player)
 
 
 def heuristic_evaluate(game_state: ClobberGameState):
@@ -97,3 +84,128 @@ def heuristic_evaluate(game_state: ClobberGameState):
     board = game_state.board
     player = game_state.current_player
     return evaluate(board, player)
+
+
+HEURISTICS = {
+    "evaluate": evaluate,
+    "live_evaluate": live_evaluate,
+    "mobility_score": mobility_score,
+    "piece_count_score": piece_count_score,
+    "isolation_score": isolation_score,
+}
+
+
+def _player_sign(player):
+    return 1 if player == 'W' else -1
+
+
+def _adjacent_pairs(a, b):
+    """
+    Count, per board, the orthogonally adjacent (a, b) square pairs of two boolean stacks.
+    """
+    return (np.sum(a[:, 1:, :] & b[:, :-1, :], axis=(1, 2)) +
+            np.sum(a[:, :-1, :] & b[:, 1:, :], axis=(1, 2)) +
+            np.sum(a[:, :, 1:] & b[:, :, :-1], axis=(1, 2)) +
+            np.sum(a[:, :, :-1] & b[:, :, 1:], axis=(1, 2)))
+
+
+def _has_neighbour(mask):
+    out = np.zeros_like(mask)
+    out[:, 1:, :] |= mask[:, :-1, :]
+    out[:, :-1, :] |= mask[:, 1:, :]
+    out[:, :, 1:] |= mask[:, :, :-1]
+    out[:, :, :-1] |= mask[:, :, 1:]
+    return out
+
+
+def batch_features(boards, player):
+    """
+    Compute the heuristic features for a stack of boards at once.
+    boards: int array (N, rows, cols) with 1 for white, -1 for black and 0 for empty squares.
+    Returns a dict of int arrays of length N: my/opp pieces, moves and isolated pieces.
+    """
+    boards = np.asarray(boards)
+    if boards.ndim == 2:
+        boards = boards[np.newaxis]
+    sign = _player_sign(player)
+    mine = boards == sign
+    theirs = boards == -sign
+    lonely = ~_has_neighbour(boards != 0)
+    return {
+        "my_pieces": mine.sum(axis=(1, 2)),
+        "opp_pieces": theirs.sum(axis=(1, 2)),
+        "my_moves": _adjacent_pairs(mine, theirs),
+        "opp_moves": _adjacent_pairs(theirs, mine),
+        "my_isolated": (mine & lonely).sum(axis=(1, 2)),
+        "opp_isolated": (theirs & lonely).sum(axis=(1, 2)),
+    }
+
+
+def batch_live_pieces(boards, player):
+    """
+    Count, per board, my and the opponent's pieces in live regions (see ClobberGameState.live_mask).
+    Returns (my live pieces, opponent live pieces) as int arrays of length N.
+    """
+    boards = np.asarray(boards)
+    if boards.ndim == 2:
+        boards = boards[np.newaxis]
+    sign = _player_sign(player)
+    mine = boards == sign
+    theirs = boards == -sign
+    occupied = mine | theirs
+    live = (mine & _has_neighbour(theirs)) | (theirs & _has_neighbour(mine))
+    while True:
+        grown = live | (_has_neighbour(live) & occupied)
+        if np.array_equal(grown, live):
+            break
+        live = grown
+    return (live & mine).sum(axis=(1, 2)), (live & theirs).sum(axis=(1, 2))
+
+
+def batch_evaluate(boards, player):
+    f = batch_features(boards, player)
+    weights = EVALUATE_WEIGHTS
+    return (weights["mobility"] * (f["my_moves"] - f["opp_moves"]) +
+            weights["pieces"] * (f["my_pieces"] - f["opp_pieces"]) +
+            weights["isolation"] * (f["opp_isolated"] - f["my_isolated"]))
+
+
+def batch_live_evaluate(boards, player):
+    f = batch_features(boards, player)
+    my_live, opp_live = batch_live_pieces(boards, player)
+    weights = EVALUATE_WEIGHTS
+    return weights["mobility"] * (f["my_moves"] - f["opp_moves"]) + weights["pieces"] * (my_live - opp_live)
+
+
+def batch_mobility_score(boards, player):
+    f = batch_features(boards, player)
+    return f["my_moves"] - f["opp_moves"]
+
+
+def batch_piece_count_score(boards, player):
+    f = batch_features(boards, player)
+    return f["my_pieces"] - f["opp_pieces"]
+
+
+def batch_isolation_score(boards, player):
+    f = batch_features(boards, player)
+    return f["opp_isolated"] - f["my_isolated"]
+
+
+BATCH_HEURISTICS = {
+    "evaluate": batch_evaluate,
+    "live_evaluate": batch_live_evaluate,
+    "mobility_score": batch_mobility_score,
+    "piece_count_score": batch_piece_count_score,
+    "isolation_score": batch_isolation_score,
+}
+
+
+def batch_version(heuristic):
+    """
+    Return the batched counterpart of one of the heuristics above, or None.
+    Looked up by name because the module may be imported both as heuristics and src.heuristics.
+    """
+    if getattr(heuristic, "__module__", "").split(".")[-1] != __name__.split(".")[-1]:
+        return None
+    return BATCH_HEURISTICS.get(heuristic.__name__)
@@ -0,0 +1,185 @@
+import math
+import time
+import numpy as np
+from game_state import ClobberGameState, masks_to_array
+
+# (row, col) step of the four move directions: up, down, left, right
+_DR = np.array([-1, 1, 0, 0])
+_DC = np.array([0, 0, -1, 1])
+
+
+def batch_playouts(boards, to_move, rng, record=None):
+    """
+    Play uniformly random games to the end on a stack of boards, all at once.
+    boards: int8 array (N, rows, cols) with 1 white, -1 black, 0 empty (changed in place);
+    to_move: int8 array (N,) with 1 where white moves next and -1 where black does.
+    Every step finds the legal moves of all unfinished boards as one boolean array (N, 4, rows, cols),
+    picks one of them per board at random and applies them all with fancy indexing.
+    record: called before every step with (indices, boards, to_move) of the unfinished games (copies).
+    Returns an int8 array (N,) with 1 where white won and -1 where black won.
+    """
+    count, rows, cols = boards.shape
+    side = to_move.astype(np.int8).copy()
+    winners = np.zeros(count, dtype=np.int8)
+    active = np.arange(count)
+    legal = np.zeros((count, 4, rows, cols), dtype=bool)
+    while active.size:
+        b = boards[active]
+        if record is not None:
+            record(active, b, side[active])
+        s = side[active][:, None, None]
+        own = b == s
+        opp = b == -s
+        moves = legal[:active.size]
+        moves[:, 0, 1:, :] = own[:, 1:, :] & opp[:, :-1, :]
+        moves[:, 1, :-1, :] = own[:, :-1, :] & opp[:, 1:, :]
+        moves[:, 2, :, 1:] = own[:, :, 1:] & opp[:, :, :-1]
+        moves[:, 3, :, :-1] = own[:, :, :-1] & opp[:, :, 1:]
+        flat = moves.reshape(active.size, -1)
+        playing = flat.any(axis=1)
+        done = active[~playing]
+        winners[done] = -side[done]
+        # a random score on every legal move and 0 elsewhere: the highest one is a uniform pick
+        choice = np.argmax(rng.random(flat.shape, dtype=np.float32) * flat, axis=1)[playing]
+        active = active[playing]
+        direction, r, c = np.unravel_index(choice, (4, rows, cols))
+        movers = side[active]
+        boards[active, r + _DR[direction], c + _DC[direction]] = movers
+        boards[active, r, c] = 0
+        side[active] = -movers
+    return winners
+
+
+class MCTSNode:
+    __slots__ = ("move", "parent", "children", "untried", "visits", "wins", "player", "key")
+
+    def __init__(self, move, parent, game_state: ClobberGameState):
+        """
+        player: the player who made move (the node's wins count that player's won playouts).
+        """
+        self.move = move
+        self.parent = parent
+        self.children = {}
+        self.untried = game_state.get_possible_moves()
+        self.visits = 0
+        self.wins = 0.0
+        self.player = 'B' if game_state.current_player == 'W' else 'W'
+        self.key = game_state.board_key()
+
+
+class MCTS:
+    """
+    UCT search with batched random playouts. Each batch walks batch_size paths down the tree (a path
+    counts as a visit as soon as it is chosen, so the next paths of the batch spread to other children),
+    expands one new node at the end of each, plays one random game from every new node in a single
+    batch_playouts call and backs the results up. The tree is kept between calls: when the next position
+    is a child or grandchild of the last root (our move and the opponent's reply), that subtree becomes
+    the new root.
+    """
+
+    def __init__(self, exploration=1.4, batch_size=64, reuse=True, seed=None):
+        self.exploration = exploration
+        self.batch_size = batch_size
+        self.reuse = reuse
+        self.rng = np.random.default_rng(seed)
+        self.root = None
+        self.iterations = 0
+        self.playouts = 0
+        self.seconds = 0.0
+        self.reused_visits = 0
+
+    def _find_root(self, game_state: ClobberGameState):
+        key = game_state.board_key()
+        root = self.root
+        if self.reuse and root is not None:
+            if root.key == key:
+                return root
+            for child in root.children.values():
+                if child.key == key:
+                    return child
+                for grandchild in child.children.values():
+                    if grandchild.key == key:
+                        return grandchild
+        return MCTSNode(None, None, game_state)
+
+    def _select(self, node):
+        log_visits = math.log(node.visits)
+        exploration = self.exploration
+        return max(node.children.values(),
+                   key=lambda child: child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits))
+
+    def _descend(self, game_state: ClobberGameState):
+        """
+        Walk from the root to a new (or terminal) node, making the moves on game_state and counting the visits.
+        Returns the path.
+        """
+        node = self.root
+        node.visits += 1
+        path = [node]
+        while not node.untried and node.children:
+            node = self._select(node)
+            game_state.make_move(node.move)
+            node.visits += 1
+            path.append(node)
+        if node.untried:
+            move = node.untried.pop(int(self.rng.integers(len(node.untried))))
+            game_state.make_move(move)
+            child = MCTSNode(move, node, game_state)
+            node.children[move] = child
+            child.visits += 1
+            path.append(child)
+        return path
+
+    def search(self, game_state: ClobberGameState, iterations=None, time_limit_ms=None):
+        """
+        Run batches until iterations playouts were played or time_limit_ms has passed (at least one batch).
+        game_state is left unchanged.
+        """
+        start = time.perf_counter()
+        deadline = start + time_limit_ms / 1000 if time_limit_ms is not None else None
+        self.root = self._find_root(game_state)
+        self.root.parent = None
+        self.reused_visits = self.root.visits
+        root_ply = game_state.ply
+        done = 0
+        while True:
+            size = self.batch_size if iterations is None else min(self.batch_size, iterations - done)
+            paths, whites, blacks, to_move = [], [], [], []
+            for _ in range(size):
+                paths.append(self._descend(game_state))
+                whites.append(game_state.white)
+                blacks.append(game_state.black)
+                to_move.append(1 if game_state.current_player == 'W' else -1)
+                while game_state.ply > root_ply:
+                    game_state.unmake_move()
+            boards = masks_to_array(game_state.rows, game_state.cols, whites, blacks)
+            winners = batch_playouts(boards, np.array(to_move, dtype=np.int8), self.rng)
+            for path, winner in zip(paths, winners):
+                winner = 'W' if winner > 0 else 'B'
+                for node in path:
+                    if node.player == winner:
+                        node.wins += 1
+            done += size
+            if iterations is not None and done >= iterations:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            if iterations is None and deadline is None:
+                break
+        seconds = time.perf_counter() - start
+        self.iterations = done
+        self.playouts += done
+        self.seconds += seconds
+        return seconds
+
+    def best_move(self, game_state: ClobberGameState, iterations=None, time_limit_ms=None):
+        """
+        Search and return the most visited move of the root (None when the game is over).
+        """
+        if game_state.is_game_over():
+            return None
+        self.search(game_state, iterations, time_limit_ms)
+        return max(self.root.children.values(), key=lambda child: child.visits).move
+
+    def playouts_per_second(self):
+        return self.playouts / self.seconds if self.seconds else 0.0
@@ -0,0 +1,136 @@
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from game_state import ClobberGameState
+from decision_tree import DecisionTree
+from heuristics import HEURISTICS
+from transposition import encode_move, decode_move
+
+MAGIC = b"CLBK"
+VERSION = 2
+# magic, version, rows, cols, plies, search depth, heuristic name, strategy, record count
+_HEADER = struct.Struct("<4sHHHBB24s16sQ")
+
+
+def opening_positions(rows, cols, plies):
+    """
+    Return one position of every class of positions reachable in fewer than plies moves from the standard
+    start, where positions that are board symmetries or colour swaps of each other form one class
+    (see ClobberGameState.canonical_key). Finished games are left out.
+    """
+    level = {ClobberGameState(rows, cols)}
+    positions = []
+    for ply in range(plies):
+        positions.extend(state for state in level if not state.is_game_over())
+        if ply == plies - 1:
+            break
+        children = {}
+        for state in level:
+            for move in state.get_possible_moves():
+                child = state.snapshot()
+                child.make_move(move)
+                children.setdefault(child.canonical_key()[0], child)
+        level = children.values()
+    return positions
+
+
+def _search_position(game_state, heuristic, strategy, depth):
+    """
+    Search one book position. Returns (canonical key, best move in the canonical image, value).
+    """
+    dt = DecisionTree(depth, game_state, HEURISTICS[heuristic], strategy, game_state.current_player, verbose=False)
+    dt._root_ply = game_state.ply
+    move, value = dt._search_root(game_state, depth, game_state.get_possible_moves())
+    key, transform, _ = game_state.canonical_key()
+    return key, encode_move(game_state.transform_move(move, transform)), value
+
+
+def build_book(path, rows, cols, plies, depth, heuristic="evaluate", strategy="alpha-beta", workers=None,
+               progress=None):
+    """
+    Search every opening position class (see opening_positions) to depth over a process pool and write
+    the best moves to path: a header and three contiguous columns (sorted canonical keys, moves in the
+    canonical image, values). progress(done, total) is called as positions finish.
+    Returns the number of positions written.
+    """
+    positions = opening_positions(rows, cols, plies)
+    records = []
+    with ProcessPoolExecutor(workers) as executor:
+        for record in executor.map(_search_position, positions, [heuristic] * len(positions),
+                                   [strategy] * len(positions), [depth] * len(positions)):
+            records.append(record)
+            if progress is not None:
+                progress(len(records), len(positions))
+    records.sort()
+    keys = np.array([record[0] for record in records], dtype="<u8")
+    moves = np.array([record[1] for record in records], dtype="<i4")
+    values = np.array([record[2] for record in records], dtype="<f4")
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, rows, cols, plies, depth, heuristic.encode(), strategy.encode(),
+                             len(records)))
+        f.write(keys.tobytes())
+        f.write(moves.tobytes())
+        f.write(values.tobytes())
+    return len(records)
+
+
+class OpeningBook:
+    """
+    Read-only, memory-mapped opening book written by build_book. A lookup is one canonical_key() of the
+    position and a binary search; the stored move is mapped back through the position's symmetry.
+    """
+    _open_books = {}
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, version, rows, cols, plies, depth, heuristic, strategy, count = _HEADER.unpack(
+                f.read(_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a Clobber opening book (version {VERSION})")
+        self.path = path
+        self.rows = rows
+        self.cols = cols
+        self.plies = plies
+        self.depth = depth
+        self.heuristic = heuristic.rstrip(b"\0").decode()
+        self.strategy = strategy.rstrip(b"\0").decode()
+        self.count = count
+        self.keys = np.memmap(path, dtype="<u8", mode="r", offset=_HEADER.size, shape=(count,))
+        self.moves = np.memmap(path, dtype="<i4", mode="r", offset=_HEADER.size + 8 * count, shape=(count,))
+        self.values = np.memmap(path, dtype="<f4", mode="r", offset=_HEADER.size + 12 * count, shape=(count,))
+        self.probes = 0
+        self.hits = 0
+
+    @classmethod
+    def open(cls, path):
+        """
+        Return the book for path, mapping the file once per process.
+        """
+        path = os.path.abspath(path)
+        if path not in cls._open_books:
+            cls._open_books[path] = cls(path)
+        return cls._open_books[path]
+
+    def lookup(self, game_state: ClobberGameState):
+        """
+        Return (move, value) for the position, or None if it is not in the book.
+        """
+        if (game_state.rows, game_state.cols) != (self.rows, self.cols):
+            return None
+        self.probes += 1
+        key, transform, _ = game_state.canonical_key()
+        key = np.uint64(key)
+        index = int(np.searchsorted(self.keys, key))
+        if index == self.count or self.keys[index] != key:
+            return None
+        move = game_state.transform_move(decode_move(int(self.moves[index])), transform, inverse=True)
+        if move not in game_state.get_possible_moves():
+            return None
+        self.hits += 1
+        return move, float(self.values[index])
+
+    def move(self, game_state: ClobberGameState):
+        found = self.lookup(game_state)
+        return found[0] if found is not None else None
@@ -0,0 +1,207 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from game_state import ClobberGameState
+from decision_tree import DecisionTree, SearchTimeout
+from regions import RegionSolver
+from tablebase import Tablebase
+from transposition import TranspositionTable
+
+_shared_alpha = None
+_shared_search_id = None
+_worker_table = None
+_worker_table_owner = None
+_worker_region_solver = None
+_worker_tablebase = None
+
+
+def _init_worker(shared_alpha, shared_search_id, tt_bytes, regions, tablebase_path):
+    global _shared_alpha, _shared_search_id, _worker_table, _worker_region_solver, _worker_tablebase
+    _shared_alpha = shared_alpha
+    _shared_search_id = shared_search_id
+    _worker_table = TranspositionTable(max_bytes=tt_bytes)
+    _worker_region_solver = RegionSolver() if regions else None
+    _worker_tablebase = Tablebase.open(tablebase_path) if tablebase_path else None
+
+
+def _search_move(game_state, index, move, heuristic, strategy, player, depth, search_id, share_alpha, remaining_s,
+                 fresh_table, symmetric, batch_leaves):
+    """
+    Worker task: search one root move and return (index, value, exact, nodes), or (index, None, False, nodes)
+    on timeout. A value searched against the shared alpha that does not beat it is only an upper bound
+    (exact is False).
+    The worker's transposition table is kept between tasks as long as heuristic, player and symmetric stay
+    the same; its region solver and tablebase (if any) are kept for the worker's lifetime.
+    The shared alpha is only used while search_id is the current search, so a late task of an
+    abandoned search can't leak its value into the next one. fresh_table starts from an empty table,
+    so the value can't depend on which tasks this worker happened to run before.
+    """
+    global _worker_table_owner
+    owner = (getattr(heuristic, "__name__", repr(heuristic)), player, game_state.rows, game_state.cols, symmetric)
+    if fresh_table or owner != _worker_table_owner:
+        _worker_table.clear()
+        _worker_table_owner = owner
+    dt = DecisionTree(depth, game_state, heuristic, strategy, player, _worker_table, batch_leaves=batch_leaves,
+                      region_solver=_worker_region_solver, tablebase=_worker_tablebase, symmetric=symmetric,
+                      verbose=False)
+    if remaining_s is not None:
+        dt.deadline = time.perf_counter() + remaining_s
+    share_alpha = share_alpha and _shared_search_id.value == search_id
+    alpha = _shared_alpha.value if share_alpha else float('-inf')
+    try:
+        value = dt.search_root_move(game_state, move, depth, alpha)
+    except SearchTimeout:
+        return index, None, False, dt.num_of_visits
+    exact = not share_alpha or value > alpha
+    if share_alpha and value > alpha:
+        with _shared_alpha.get_lock():
+            if _shared_search_id.value == search_id and value > _shared_alpha.value:
+                _shared_alpha.value = value
+    return index, value, exact, dt.num_of_visits
+
+
+class ParallelSearch:
+    """
+    Root-splitting search over a process pool: every root move is a separate task.
+    In the default mode the workers share the best root value found so far as alpha, so later root moves
+    are cut off early; those only return upper bounds, and the move is chosen among the exact values.
+    With reproducible=True every root move gets a full window; values are then exact and the result
+    (earliest move with the best value) is the same as the single-process search.
+    regions, tablebase_path, symmetric and batch_leaves are the ClobberAgent options of the same name; every
+    worker builds its own region solver and opens the tablebase once.
+    """
+
+    def __init__(self, workers, reproducible=False, tt_bytes=16 * 1024 * 1024, regions=False, tablebase_path=None,
+                 symmetric=False, batch_leaves=False):
+        self.workers = workers
+        self.reproducible = reproducible
+        self.tt_bytes = tt_bytes
+        self.regions = regions
+        self.tablebase_path = tablebase_path
+        self.symmetric = symmetric
+        self.batch_leaves = batch_leaves
+        self.shared_alpha = multiprocessing.Value('d', float('-inf'))
+        self.shared_search_id = multiprocessing.Value('i', 0)
+        self.executor = None
+        self.num_of_visits = 0
+        self.depth_timings = []
+
+    def _pool(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                                initargs=(self.shared_alpha, self.shared_search_id, self.tt_bytes,
+                                                          self.regions, self.tablebase_path))
+        return self.executor
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def _search_depth(self, game_state, moves, heuristic, strategy, player, depth, deadline):
+        """
+        Search all root moves to one depth. Returns (best_move, value), or None if the deadline passed.
+        """
+        pool = self._pool()
+        share_alpha = not self.reproducible and strategy != 'minmax'
+        with self.shared_alpha.get_lock():
+            self.shared_search_id.value += 1
+            self.shared_alpha.value = float('-inf')
+        search_id = self.shared_search_id.value
+        remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+        futures = [pool.submit(_search_move, game_state, index, move, heuristic, strategy, player,
+                               depth, search_id, share_alpha, remaining, self.reproducible, self.symmetric,
+                               self.batch_leaves)
+                   for index, move in enumerate(moves)]
+        values = [None] * len(moves)
+        exact = [False] * len(moves)
+        pending = set(futures)
+        timed_out = False
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                timed_out = True
+                break
+            for future in done:
+                index, value, exact[index], nodes = future.result()
+                self.num_of_visits += nodes
+                if value is None:
+                    timed_out = True
+                values[index] = value
+        if timed_out:
+            for future in pending:
+                future.cancel()
+            return None
+        # only exact values compete: an upper bound equal to the best value does not show that move is as good
+        best = max((i for i in range(len(moves)) if exact[i]), key=lambda i: (values[i], -i))
+        return moves[best], values[best]
+
+    def best_move(self, game_state: ClobberGameState, heuristic, strategy, player, max_depth, time_limit_ms=None):
+        """
+        Return the best move for player. With a time limit the search deepens iteratively and
+        returns the best move of the deepest depth for which every root move finished.
+        """
+        self.num_of_visits = 0
+        self.depth_timings = []
+        moves = game_state.get_possible_moves()
+        if not moves:
+            return None
+        root = game_state.snapshot()
+        if time_limit_ms is None:
+            move, _ = self._search_depth(root, moves, heuristic, strategy, player, max_depth, None)
+            return move
+
+        deadline = time.perf_counter() + time_limit_ms / 1000
+        max_depth_cap = game_state.get_num_of_pieces('W') + game_state.get_num_of_pieces('B')
+        if max_depth is not None:
+            max_depth_cap = min(max_depth_cap, max_depth)
+        best_move = moves[0]
+        for depth in range(1, max_depth_cap + 1):
+            iteration_start = time.perf_counter()
+            nodes_before = self.num_of_visits
+            result = self._search_depth(root, moves, heuristic, strategy, player, depth, deadline)
+            if result is None:
+                break
+            best_move = result[0]
+            self.depth_timings.append({
+                "depth": depth,
+                "seconds": time.perf_counter() - iteration_start,
+                "nodes": self.num_of_visits - nodes_before,
+                "move": result[0],
+                "value": result[1],
+            })
+            moves = [best_move] + [move for move in moves if move != best_move]
+            if time.perf_counter() >= deadline:
+                break
+        return best_move
+
+
+def measure_speedup(game_state: ClobberGameState, heuristic, strategy, depth, workers, reproducible=True):
+    """
+    Search the same position with the single-process DecisionTree and with ParallelSearch
+    and return the timings, node counts and speedup.
+    """
+    player = game_state.current_player
+    start = time.perf_counter()
+    dt = DecisionTree(depth, game_state, heuristic, strategy, player)
+    sequential_move = dt.get_best_move(game_state)
+    sequential_s = time.perf_counter() - start
+
+    search = ParallelSearch(workers, reproducible=reproducible)
+    search._pool().submit(int).result()
+    start = time.perf_counter()
+    parallel_move = search.best_move(game_state, heuristic, strategy, player, depth)
+    parallel_s = time.perf_counter() - start
+    search.close()
+    return {
+        "workers": workers,
+        "sequential_s": sequential_s,
+        "parallel_s": parallel_s,
+        "speedup": sequential_s / parallel_s if parallel_s else float('inf'),
+        "sequential_nodes": dt.num_of_visits,
+        "parallel_nodes": search.num_of_visits,
+        "sequential_move": sequential_move,
+        "parallel_move": parallel_move,
+        "same_move": sequential_move == parallel_move,
+    }
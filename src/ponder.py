@@ -0,0 +1,128 @@
+import threading
+from game_state import ClobberGameState
+from decision_tree import DecisionTree, SearchTimeout
+
+
+class Ponderer:
+    """
+    Searches on the opponent's time. After the agent moves, a background thread plays the expected
+    reply ('predict': the best reply stored in the agent's transposition table) or every reply ('all',
+    one depth at a time over all of them) on a copy of the position and deepens the agent's answers,
+    storing everything in the agent's transposition table. The thread mostly runs while the main thread
+    is blocked waiting for the opponent, so it costs no thinking time.
+    When the real reply arrives, answer() ends the search; if the reply was searched to the agent's depth,
+    the stored answer can be played at once, otherwise a timed search continues from the pondered depth
+    and every search starts with a warm table. heuristic is the one pondered with (the agent's heuristic
+    when pondering started, i.e. the one its next search uses).
+    """
+
+    def __init__(self, agent, mode='predict'):
+        if mode not in ('predict', 'all'):
+            raise ValueError(f"Unknown ponder mode: {mode}")
+        self.agent = agent
+        self.mode = mode
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.answers = {}
+        self.num_of_visits = 0
+        self.hits = 0
+        self.misses = 0
+        self.pondering = False
+        self.heuristic = agent.heuristic
+
+    def _tree(self, game_state, max_depth):
+        agent = self.agent
+        dt = DecisionTree(max_depth, game_state, self.heuristic, agent.strategy, agent.name,
+                          agent.transposition_table, region_solver=agent.region_solver,
+                          tablebase=agent.tablebase, symmetric=agent.symmetric, verbose=False,
+                          stop_event=self.stop_event)
+        dt.deadline = float('inf')
+        return dt
+
+    def _replies(self, game_state, dt):
+        replies = game_state.get_possible_moves()
+        entry = dt._table.probe(dt._key(game_state))
+        predicted = entry[3] if entry is not None and entry[3] in replies else (replies[0] if replies else None)
+        if self.mode == 'predict':
+            return [predicted] if predicted is not None else []
+        if predicted is not None:
+            replies.remove(predicted)
+            replies.insert(0, predicted)
+        return replies
+
+    def _run(self, game_state: ClobberGameState):
+        max_depth = self.agent.max_depth
+        if max_depth is None:
+            max_depth = game_state.get_num_of_pieces('W') + game_state.get_num_of_pieces('B')
+        dt = self._tree(game_state, max_depth)
+        replies = self._replies(game_state, dt)
+        start_ply = game_state.ply
+        try:
+            for depth in range(1, max_depth + 1):
+                for reply in replies:
+                    game_state.make_move(reply)
+                    key = game_state.board_key()
+                    moves = game_state.get_possible_moves()
+                    if moves:
+                        dt._root_ply = game_state.ply
+                        previous = self.answers.get(key)
+                        if previous is not None:
+                            moves.remove(previous[1])
+                            moves.insert(0, previous[1])
+                        visits_before = dt.num_of_visits
+                        move, _ = dt._search_root(game_state, depth, moves)
+                        self.num_of_visits += dt.num_of_visits - visits_before
+                        self.answers[key] = (depth, move)
+                    game_state.unmake_move()
+        except SearchTimeout:
+            while game_state.ply > start_ply:
+                game_state.unmake_move()
+
+    def start(self, game_state: ClobberGameState):
+        """
+        Start pondering on the position after our move (the opponent to move).
+        """
+        self.stop()
+        self.stop_event.clear()
+        self.answers = {}
+        self.num_of_visits = 0
+        self.heuristic = self.agent.heuristic
+        if game_state.is_game_over():
+            return
+        self.pondering = True
+        self.thread = threading.Thread(target=self._run, args=(game_state.snapshot(),), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def answer(self, game_state: ClobberGameState):
+        """
+        Stop pondering and return (depth, move) searched for the position after the opponent's reply,
+        or None if that position was not reached (or nothing was pondered).
+        """
+        self.stop()
+        if not self.pondering:
+            return None
+        self.pondering = False
+        result = self.answers.get(game_state.board_key())
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+
+def latency_report(agent):
+    """
+    One-line summary of an agent's response times and ponder hits over the game.
+    """
+    latencies = [record["seconds"] * 1000 for record in agent.move_stats]
+    if not latencies:
+        return f"{agent.name}: no moves"
+    hits = sum(record["ponder_hit"] for record in agent.move_stats)
+    return (f"{agent.name}: {len(latencies)} moves, latency mean {sum(latencies) / len(latencies):.1f} ms, "
+            f"max {max(latencies):.1f} ms, ponder hits {hits}/{len(latencies)}")
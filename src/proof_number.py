@@ -0,0 +1,253 @@
+import time
+import numpy as np
+from game_state import ClobberGameState
+from decision_tree import SearchTimeout
+
+# proof or disproof number of a position that can no longer be proven (or disproven)
+INFINITE = 0xFFFFFFFF
+_ENTRY_BYTES = 8 + 4 + 4 + 4 + 1
+
+
+class ProofTable:
+    """
+    Fixed-size table of proof and disproof numbers indexed by the key of a position.
+    Each slot holds the full key, both numbers, the work (nodes searched) behind them and the search
+    (generation) that stored them; a slot is replaced when it is empty, holds the same position, comes from
+    an older search or holds less work than the new entry, so the results of big subtrees survive when memory
+    runs out, but not past the search that made them.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        capacity = 1
+        while capacity * 2 * _ENTRY_BYTES <= max_bytes:
+            capacity *= 2
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.keys = np.zeros(capacity, dtype=np.uint64)
+        self.proofs = np.zeros(capacity, dtype=np.uint32)
+        self.disproofs = np.zeros(capacity, dtype=np.uint32)
+        self.work = np.zeros(capacity, dtype=np.uint32)
+        self.generations = np.zeros(capacity, dtype=np.uint8)
+        self.generation = 0
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def new_search(self):
+        """
+        Start a new search (e.g. a new turn); entries from older searches become preferred victims.
+        """
+        self.generation = (self.generation + 1) % 256
+
+    def clear(self):
+        self.work.fill(0)
+        self.generation = 0
+
+    def probe(self, key):
+        """
+        Return [proof, disproof] stored for the key, or None.
+        """
+        self.probes += 1
+        index = key & self.mask
+        if not self.work[index] or int(self.keys[index]) != key:
+            return None
+        self.hits += 1
+        return [int(self.proofs[index]), int(self.disproofs[index])]
+
+    def store(self, key, proof, disproof, work):
+        index = key & self.mask
+        work = max(1, min(work, INFINITE))
+        stored_work = int(self.work[index])
+        if stored_work and int(self.keys[index]) != key:
+            if self.generations[index] == self.generation and work < stored_work:
+                return
+            self.replacements += 1
+        self.keys[index] = key
+        self.proofs[index] = proof
+        self.disproofs[index] = disproof
+        self.work[index] = work
+        self.generations[index] = self.generation
+        self.stores += 1
+
+    def stats(self):
+        return {
+            "capacity": self.capacity,
+            "probes": self.probes,
+            "hits": self.hits,
+            "stores": self.stores,
+            "replacements": self.replacements,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+        }
+
+
+class ProofNumberSearch:
+    """
+    Exact solver: depth-first proof-number search (df-pn with the 1 + epsilon threshold trick).
+    Numbers are from the point of view of the side to move: the proof number of a position is the least
+    number of positions that must still be solved to show the side to move wins, the disproof number the
+    same for a loss. A position with no captures is lost (proof INFINITE, disproof 0); otherwise its proof
+    number is the smallest disproof number of its children and its disproof number the sum of their proof
+    numbers. The search always descends into the most promising child and only returns once that child's
+    numbers pass the thresholds it was given, so it needs memory only for the path and the table.
+    An unexplored child starts with proof 1 and disproof equal to its number of captures.
+    Proof numbers are kept in a memory-bounded ProofTable that survives between solve() calls, keyed by
+    the canonical key (symmetric positions and colour swaps share entries) or the Zobrist key.
+    exact_solvers: tablebase.Tablebase / regions.RegionSolver objects whose winner() settles positions
+    without searching them. They are only asked about children of positions with at most solver_pieces
+    pieces next to another piece: on bigger positions splitting into regions and valuing them costs more
+    than the search it saves.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, max_nodes=None, time_limit_ms=None, epsilon=0.25,
+                 symmetric=True, exact_solvers=(), solver_pieces=10):
+        self.table = ProofTable(max_bytes)
+        self.max_nodes = max_nodes
+        self.time_limit_ms = time_limit_ms
+        self.epsilon = epsilon
+        self.symmetric = symmetric
+        self.exact_solvers = [solver for solver in exact_solvers if solver is not None]
+        self.solver_pieces = solver_pieces
+        self.nodes = 0
+        self.num_of_solved = 0
+        self.deadline = None
+        self.node_limit = None
+        self._deadline_ticks = 0
+
+    def _key(self, game_state):
+        return game_state.canonical_key()[0] if self.symmetric else game_state.zobrist
+
+    def _check_budget(self):
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchTimeout()
+        self._deadline_ticks += 1
+        if self.deadline is not None and not self._deadline_ticks & 255 and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+
+    def _initial(self, game_state, move):
+        """
+        [proof, disproof] of the position after move before it is searched, and its key: from the table,
+        the end of the game, an exact solver (for small positions) or the number of captures.
+        """
+        key, captures = game_state.child_key(move, self.symmetric)
+        entry = self.table.probe(key)
+        if entry is not None:
+            return entry, key
+        if not captures:
+            return [INFINITE, 0], key
+        white_pieces, black_pieces, _, white_isolated, black_isolated = game_state.features
+        if (self.exact_solvers and
+                white_pieces + black_pieces - white_isolated - black_isolated <= self.solver_pieces):
+            game_state.make_move(move)
+            try:
+                for solver in self.exact_solvers:
+                    winner = solver.winner(game_state)
+                    if winner is not None:
+                        self.num_of_solved += 1
+                        entry = [0, INFINITE] if winner == game_state.current_player else [INFINITE, 0]
+                        self.table.store(key, entry[0], entry[1], 1)
+                        return entry, key
+            finally:
+                game_state.unmake_move()
+        return [1, captures], key
+
+    def _mid(self, game_state, key, proof_threshold, disproof_threshold):
+        """
+        Search the position until its proof number reaches proof_threshold or its disproof number reaches
+        disproof_threshold. Returns (proof, disproof, move), move being the child with the smallest
+        disproof number (a winning move once the proof number is 0).
+        """
+        self._check_budget()
+        self.nodes += 1
+        nodes_before = self.nodes
+        moves = game_state.get_possible_moves(ordered=False)
+        if not moves:
+            self.table.store(key, INFINITE, 0, 1)
+            return INFINITE, 0, None
+        children, keys = [], []
+        for move in moves:
+            entry, child_key = self._initial(game_state, move)
+            children.append(entry)
+            keys.append(child_key)
+        epsilon = 1 + self.epsilon
+        while True:
+            best = second = INFINITE
+            best_index = 0
+            total = 0
+            for index, (child_proof, child_disproof) in enumerate(children):
+                total += child_proof
+                if child_disproof < best:
+                    best, second, best_index = child_disproof, best, index
+                elif child_disproof < second:
+                    second = child_disproof
+            proof, disproof = best, min(total, INFINITE)
+            if proof >= proof_threshold or disproof >= disproof_threshold:
+                break
+            child = children[best_index]
+            child_proof_threshold = min(INFINITE, disproof_threshold - disproof + child[0])
+            child_disproof_threshold = min(proof_threshold,
+                                           INFINITE if second == INFINITE else int(second * epsilon) + 1)
+            game_state.make_move(moves[best_index])
+            try:
+                child[0], child[1], _ = self._mid(game_state, keys[best_index], child_proof_threshold,
+                                                  child_disproof_threshold)
+            except SearchTimeout:
+                # keep the progress made on the path, so a later search continues from it
+                self.table.store(key, proof, disproof, self.nodes - nodes_before + 1)
+                raise
+            finally:
+                game_state.unmake_move()
+        self.table.store(key, proof, disproof, self.nodes - nodes_before + 1)
+        return proof, disproof, moves[best_index]
+
+    def solve(self, game_state: ClobberGameState, max_nodes=None, time_limit_ms=None):
+        """
+        Solve the position for the side to move within the node and time budgets (arguments or the
+        defaults given to the constructor; None is unlimited). game_state is left unchanged.
+        Returns a dict: winner ('W', 'B', or None when the budget ran out first), move (a winning move of
+        the side to move when it wins, else None), proof and disproof numbers of the position, nodes
+        searched, seconds and the table statistics. Stopped searches keep their table entries, so solving
+        the same position again continues where they left off.
+        """
+        max_nodes = self.max_nodes if max_nodes is None else max_nodes
+        time_limit_ms = self.time_limit_ms if time_limit_ms is None else time_limit_ms
+        start = time.perf_counter()
+        self.deadline = start + time_limit_ms / 1000 if time_limit_ms is not None else None
+        self.node_limit = self.nodes + max_nodes if max_nodes is not None else None
+        self.table.new_search()
+        self.table.reset_counters()
+        nodes_before = self.nodes
+        mover = game_state.current_player
+        proof, disproof, move = None, None, None
+        try:
+            proof, disproof, move = self._mid(game_state, self._key(game_state), INFINITE, INFINITE)
+        except SearchTimeout:
+            entry = self.table.probe(self._key(game_state))
+            if entry is not None:
+                proof, disproof = entry
+        finally:
+            self.deadline = None
+            self.node_limit = None
+        winner = None
+        if proof == 0:
+            winner = mover
+        elif disproof == 0:
+            winner = 'B' if mover == 'W' else 'W'
+        return {
+            "winner": winner,
+            "move": move if winner == mover else None,
+            "proof": proof,
+            "disproof": disproof,
+            "nodes": self.nodes - nodes_before,
+            "seconds": time.perf_counter() - start,
+            "table": self.table.stats(),
+        }
+
+    def best_move(self, game_state: ClobberGameState, max_nodes=None, time_limit_ms=None):
+        """
+        Return a winning move if the side to move is proven to win within the budget, else None.
+        """
+        return self.solve(game_state, max_nodes, time_limit_ms)["move"]
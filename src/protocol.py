@@ -0,0 +1,234 @@
+import struct
+import time
+from game_state import ClobberGameState
+
+MAGIC = b"CLBR"
+VERSION = 1
+
+HELLO = ord("H")
+MOVE = ord("M")
+RESULT = ord("R")
+SEAT = ord("S")
+
+# type, magic, version, rows, cols, clock_ms (0: no clock), increment_ms
+_HELLO = struct.Struct("<B4sBBBII")
+# type, r, c, new_r, new_c
+_MOVE = struct.Struct("<BBBBB")
+# type, winner ('W' or 'B'), reason
+_RESULT = struct.Struct("<BcB")
+# type, colour assigned by an arena server
+_SEAT = struct.Struct("<Bc")
+
+NO_MOVES = 0
+TIME_FORFEIT = 1
+ILLEGAL_MOVE = 2
+DISCONNECTED = 3
+REASONS = {NO_MOVES: "no moves left", TIME_FORFEIT: "time forfeit", ILLEGAL_MOVE: "illegal move",
+           DISCONNECTED: "disconnected"}
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode_hello(rows, cols, clock_ms=None, increment_ms=0):
+    return _HELLO.pack(HELLO, MAGIC, VERSION, rows, cols, int(clock_ms or 0), int(increment_ms))
+
+
+def encode_move(move):
+    (r, c), (new_r, new_c) = move
+    return _MOVE.pack(MOVE, r, c, new_r, new_c)
+
+
+def encode_result(winner, reason):
+    return _RESULT.pack(RESULT, winner.encode(), reason)
+
+
+def encode_seat(colour):
+    return _SEAT.pack(SEAT, colour.encode())
+
+
+def decode_message(data):
+    """
+    Decode one message into (kind, payload): ('hello', settings dict), ('move', move), ('result', (winner, reason))
+    or ('seat', colour).
+    Anything else raises ProtocolError; nothing is ever unpickled.
+    """
+    if not data:
+        raise ProtocolError("empty message")
+    kind = data[0]
+    try:
+        if kind == HELLO:
+            _, magic, version, rows, cols, clock_ms, increment_ms = _HELLO.unpack(data)
+            if magic != MAGIC or version != VERSION:
+                raise ProtocolError(f"unsupported protocol {magic!r} version {version}")
+            return "hello", {"rows": rows, "cols": cols, "clock_ms": clock_ms or None, "increment_ms": increment_ms}
+        if kind == MOVE:
+            _, r, c, new_r, new_c = _MOVE.unpack(data)
+            return "move", ((r, c), (new_r, new_c))
+        if kind == RESULT:
+            _, winner, reason = _RESULT.unpack(data)
+            winner = winner.decode()
+            if winner not in ("W", "B") or reason not in REASONS:
+                raise ProtocolError(f"bad result {winner!r} {reason}")
+            return "result", (winner, reason)
+        if kind == SEAT:
+            _, colour = _SEAT.unpack(data)
+            colour = colour.decode()
+            if colour not in ("W", "B"):
+                raise ProtocolError(f"bad seat {colour!r}")
+            return "seat", colour
+    except struct.error as e:
+        raise ProtocolError(f"malformed message of {len(data)} bytes") from e
+    raise ProtocolError(f"unknown message type {kind}")
+
+
+class GameClock:
+    """
+    Chess clock for both players: clock_ms each for the whole game plus increment_ms after every move.
+    Without clock_ms only the time used is counted.
+    """
+
+    def __init__(self, clock_ms=None, increment_ms=0):
+        self.clock_ms = clock_ms
+        self.increment_ms = increment_ms
+        self.remaining = {"W": clock_ms, "B": clock_ms} if clock_ms else None
+        self.used = {"W": 0.0, "B": 0.0}
+        self.running = None
+        self._started = None
+
+    def start(self, player):
+        self.running = player
+        self._started = time.perf_counter()
+
+    def stop(self):
+        """
+        Stop the running clock and return the milliseconds it ran.
+        """
+        elapsed = (time.perf_counter() - self._started) * 1000
+        player = self.running
+        self.used[player] += elapsed
+        if self.remaining is not None:
+            self.remaining[player] -= elapsed
+            if self.remaining[player] >= 0:
+                self.remaining[player] += self.increment_ms
+        self.running = None
+        return elapsed
+
+    def flagged(self, player):
+        return self.remaining is not None and self.remaining[player] < 0
+
+
+class MoveChannel:
+    """
+    Message layer over a multiprocessing.connection Connection: raw bytes only (send_bytes / recv_bytes),
+    with counts of the bytes and messages that went each way.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.messages_sent = 0
+        self.messages_received = 0
+
+    def send(self, data):
+        self.conn.send_bytes(data)
+        self.bytes_sent += len(data)
+        self.messages_sent += 1
+
+    def recv(self):
+        data = self.conn.recv_bytes(64)
+        self.bytes_received += len(data)
+        self.messages_received += 1
+        return decode_message(data)
+
+    def host_handshake(self, rows, cols, clock_ms=None, increment_ms=0):
+        """
+        Propose the game settings and wait for the guest to echo them back.
+        """
+        self.send(encode_hello(rows, cols, clock_ms, increment_ms))
+        kind, settings = self.recv()
+        expected = {"rows": rows, "cols": cols, "clock_ms": clock_ms or None, "increment_ms": increment_ms}
+        if kind != "hello" or settings != expected:
+            raise ProtocolError(f"handshake rejected: {settings}")
+        return settings
+
+    def guest_handshake(self):
+        """
+        Receive the host's settings and accept them.
+        """
+        kind, settings = self.recv()
+        if kind != "hello":
+            raise ProtocolError(f"expected a hello, got {kind}")
+        self.send(encode_hello(settings["rows"], settings["cols"], settings["clock_ms"], settings["increment_ms"]))
+        return settings
+
+    def close(self):
+        self.conn.close()
+
+
+def new_game(settings):
+    return ClobberGameState(settings["rows"], settings["cols"])
+
+
+def play_match(channel: MoveChannel, agent, game_state: ClobberGameState, colour, clock: GameClock, referee=False):
+    """
+    Play a game over the channel after the handshake: both sides keep their own copy of the position and
+    only exchange moves. Received moves are checked against the legal moves, and both clocks are run
+    locally (the opponent's clock runs from our move until theirs arrives). The side that ends the game
+    (last move, time forfeit or an illegal move from the other side) sends the result.
+    referee: the other side is a server (arena) that keeps the authoritative clocks; time forfeits are then
+    only decided and sent by it, and the local clocks just give the agent its time budget.
+    The game is appended to the agent's record_writer, if it has one, however it ended.
+    Returns (winner, reason).
+    """
+    writer, agent.record_writer = agent.record_writer, None
+    try:
+        winner, reason = _play_moves(channel, agent, game_state, colour, clock, referee)
+    finally:
+        agent.record_writer = writer
+    if writer is not None:
+        info = {"clock_ms": clock.clock_ms, "increment_ms": clock.increment_ms, **agent.record_info}
+        writer.append_game(game_state, winner, reason, **info)
+        writer.flush()
+    return winner, reason
+
+
+def _play_moves(channel, agent, game_state, colour, clock, referee):
+    opponent = "B" if colour == "W" else "W"
+    while True:
+        if game_state.current_player == colour:
+            clock.start(colour)
+            if clock.remaining is not None:
+                agent.clock_remaining_ms = clock.remaining[colour]
+            agent.play(game_state)
+            move = agent.move_stats[-1]["move"]
+            clock.stop()
+            if not referee and clock.flagged(colour):
+                channel.send(encode_result(opponent, TIME_FORFEIT))
+                return opponent, TIME_FORFEIT
+            channel.send(encode_move(move))
+            if game_state.is_game_over():
+                channel.send(encode_result(colour, NO_MOVES))
+                return colour, NO_MOVES
+        else:
+            clock.start(opponent)
+            kind, payload = channel.recv()
+            clock.stop()
+            if kind == "result":
+                return payload
+            if kind != "move":
+                raise ProtocolError(f"expected a move, got {kind}")
+            if not referee and clock.flagged(opponent):
+                channel.send(encode_result(colour, TIME_FORFEIT))
+                return colour, TIME_FORFEIT
+            if payload not in game_state.get_possible_moves():
+                channel.send(encode_result(colour, ILLEGAL_MOVE))
+                return colour, ILLEGAL_MOVE
+            game_state.make_move(payload)
+            if game_state.is_game_over():
+                kind, result = channel.recv()
+                if kind != "result" or result != (opponent, NO_MOVES):
+                    raise ProtocolError(f"expected the result ({opponent}, no moves left), got {kind} {result}")
+                return result
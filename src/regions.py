@@ -0,0 +1,226 @@
+from game_state import ClobberGameState, connected_components, region_key, canonical_region_key, iter_bits, popcount
+
+ZERO = 0
+
+
+class GameValues:
+    """
+    Interned combinatorial game values in canonical form. White is Left and black is Right;
+    a value is an id whose options are tuples of ids. Clobber regions are short games, so
+    their canonical forms stay small and sums of many regions can be compared exactly.
+    """
+
+    def __init__(self):
+        self.options = [((), ())]
+        self.ids = {(frozenset(), frozenset()): ZERO}
+        self._le = {}
+        self._sum = {}
+        self._neg = {ZERO: ZERO}
+
+    def _intern(self, left, right):
+        form = (frozenset(left), frozenset(right))
+        if form not in self.ids:
+            self.ids[form] = len(self.options)
+            self.options.append((tuple(form[0]), tuple(form[1])))
+        return self.ids[form]
+
+    def le(self, g, h):
+        """
+        g <= h: no Left option of g is >= h and no Right option of h is <= g.
+        """
+        if g == h:
+            return True
+        key = (g, h)
+        result = self._le.get(key)
+        if result is None:
+            g_left, _ = self.options[g]
+            _, h_right = self.options[h]
+            result = (not any(self.le(h, gl) for gl in g_left) and
+                      not any(self.le(hr, g) for hr in h_right))
+            self._le[key] = result
+        return result
+
+    def make(self, left, right):
+        """
+        Return the canonical value {left | right}: dominated options removed and reversible ones bypassed.
+        """
+        left, right = set(left), set(right)
+        while True:
+            left = {a for a in left if not any(b != a and self.le(a, b) for b in left)}
+            right = {a for a in right if not any(b != a and self.le(b, a) for b in right)}
+            game = self._intern(left, right)
+            changed = False
+            for option in list(left):
+                for reverse in self.options[option][1]:
+                    if self.le(reverse, game):
+                        left.discard(option)
+                        left.update(self.options[reverse][0])
+                        changed = True
+                        break
+                if changed:
+                    break
+            if not changed:
+                for option in list(right):
+                    for reverse in self.options[option][0]:
+                        if self.le(game, reverse):
+                            right.discard(option)
+                            right.update(self.options[reverse][1])
+                            changed = True
+                            break
+                    if changed:
+                        break
+            if not changed:
+                return game
+
+    def negate(self, g):
+        """
+        -g = {-R | -L}: the game with the roles of Left and Right swapped (canonical if g is).
+        """
+        result = self._neg.get(g)
+        if result is None:
+            left, right = self.options[g]
+            result = self._intern([self.negate(gr) for gr in right], [self.negate(gl) for gl in left])
+            self._neg[g] = result
+            self._neg[result] = g
+        return result
+
+    def add(self, g, h):
+        if g == ZERO:
+            return h
+        if h == ZERO:
+            return g
+        key = (g, h) if g <= h else (h, g)
+        result = self._sum.get(key)
+        if result is None:
+            g_left, g_right = self.options[g]
+            h_left, h_right = self.options[h]
+            left = [self.add(gl, h) for gl in g_left] + [self.add(g, hl) for hl in h_left]
+            right = [self.add(gr, h) for gr in g_right] + [self.add(g, hr) for hr in h_right]
+            result = self.make(left, right)
+            self._sum[key] = result
+        return result
+
+    def first_player_wins(self, g, player):
+        """
+        Whether the given player ('W' is Left) wins when moving first in g (the last player to move wins).
+        """
+        if player == 'W':
+            return not self.le(g, ZERO)
+        return not self.le(ZERO, g)
+
+
+class RegionSolver:
+    """
+    Exact late-game solver built on the independent regions of a position.
+    Regions with one colour only are dead and ignored; every live region gets an exact game value,
+    memoised by its canonical region key (see game_state.canonical_region_key: mirrored and rotated copies
+    share an entry, a colour-swapped copy gets the negated value), and the values are added up.
+    Positions with a live region above max_region_size or more than max_live_pieces live pieces are not solved.
+    """
+
+    def __init__(self, max_region_size=10, max_live_pieces=20):
+        self.max_region_size = max_region_size
+        self.max_live_pieces = max_live_pieces
+        self.values = GameValues()
+        self.region_values = {}
+        self._canonical = {}
+        self._keys = {}
+        self.solved_positions = 0
+        self.region_hits = 0
+
+    def region_value(self, key):
+        """
+        Exact value of a region given by its key (height, width, white bits, black bits).
+        """
+        canonical = self._canonical.get(key)
+        if canonical is None:
+            canonical = self._canonical[key] = canonical_region_key(key)
+        key, swapped = canonical
+        value = self.region_values.get(key)
+        if value is not None:
+            self.region_hits += 1
+        else:
+            height, width, white, black = key
+            left = [self._child_value(height, width, white, black, move, 'W') for move in
+                    _region_moves(height, width, white, black)]
+            right = [self._child_value(height, width, black, white, move, 'B') for move in
+                     _region_moves(height, width, black, white)]
+            value = self.values.make(left, right)
+            self.region_values[key] = value
+        return self.values.negate(value) if swapped else value
+
+    def _child_value(self, height, width, own, opp, move, player):
+        start, end = move
+        own = (own ^ start) | end
+        opp &= ~end
+        white, black = (own, opp) if player == 'W' else (opp, own)
+        return self.sum_of_regions(height, width, white, black)
+
+    def sum_of_regions(self, rows, cols, white, black):
+        total = ZERO
+        for region in connected_components(white | black, rows, cols):
+            if region & white and region & black:
+                total = self.values.add(total, self.region_value(region_key(rows, cols, white, black, region)))
+        return total
+
+    def position_value(self, game_state: ClobberGameState):
+        """
+        Return the exact value of the position, or None if it is too big to solve.
+        """
+        live = game_state.live_regions()
+        live_pieces = 0
+        for region in live:
+            size = popcount(region)
+            if size > self.max_region_size:
+                return None
+            live_pieces += size
+        if live_pieces > self.max_live_pieces:
+            return None
+        total = ZERO
+        for region in live:
+            pieces = (game_state.rows, game_state.cols, game_state.white & region, game_state.black & region)
+            key = self._keys.get(pieces)
+            if key is None:
+                key = self._keys[pieces] = game_state.region_key(region)
+            total = self.values.add(total, self.region_value(key))
+        return total
+
+    def winner(self, game_state: ClobberGameState):
+        """
+        Return the winner with perfect play ('W' or 'B') from the position with the current side to move,
+        or None if the position is too big to solve.
+        """
+        white_pieces, black_pieces, _, white_isolated, black_isolated = game_state.features
+        if white_pieces + black_pieces - white_isolated - black_isolated > 2 * self.max_live_pieces:
+            # far too many pieces with a neighbour; skip the region split
+            return None
+        value = self.position_value(game_state)
+        if value is None:
+            return None
+        self.solved_positions += 1
+        mover = game_state.current_player
+        if self.values.first_player_wins(value, mover):
+            return mover
+        return 'B' if mover == 'W' else 'W'
+
+
+def _region_moves(height, width, own, opp):
+    """
+    Yield (start bit, end bit) of every capture of own pieces on a height x width box.
+    """
+    cols = width
+    full = (1 << (height * width)) - 1
+    first_col = 0
+    for r in range(height):
+        first_col |= 1 << (r * cols)
+    not_first_col = full & ~first_col
+    not_last_col = full & ~(first_col << (cols - 1))
+    for shift_up, mask, step in ((True, full, cols), (False, full, cols),
+                                 (True, not_last_col, 1), (False, not_first_col, 1)):
+        if shift_up:
+            sources = own & ((opp & mask) << step)
+        else:
+            sources = own & ((opp & mask) >> step)
+        for i in iter_bits(sources):
+            start = 1 << i
+            yield start, (start >> step) if shift_up else (start << step)
@@ -0,0 +1,203 @@
+import os
+import struct
+import time
+import numpy as np
+from game_state import ClobberGameState, canonical_region_key, popcount
+from regions import RegionSolver, ZERO
+
+MAGIC = b"CLTB"
+VERSION = 2
+_HEADER = struct.Struct("<4sHHQ")
+
+# outcome classes of a region (W is Left, B is Right)
+ZERO_GAME = 0   # the player to move loses
+WHITE_WINS = 1  # white wins whoever moves first
+BLACK_WINS = 2  # black wins whoever moves first
+FIRST_WINS = 3  # the player to move wins
+
+_MAX_AREA = 56
+
+
+def pack_key(key):
+    """
+    Pack a region key (height, width, white bits, black bits) into two 64-bit ints.
+    """
+    height, width, white, black = key
+    return (height << 60) | (width << 56) | white, black
+
+
+def enumerate_shapes(max_size):
+    """
+    Yield every fixed polyomino (set of (r, c) cells touching row 0 and column 0) with up to max_size cells.
+    """
+    level = {frozenset([(0, 0)])}
+    for size in range(1, max_size + 1):
+        for shape in level:
+            yield shape
+        if size == max_size:
+            break
+        grown = set()
+        for shape in level:
+            for r, c in shape:
+                for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+                    cell = (r + dr, c + dc)
+                    if cell in shape:
+                        continue
+                    cells = shape | {cell}
+                    top = min(cr for cr, _ in cells)
+                    left = min(cc for _, cc in cells)
+                    grown.add(frozenset((cr - top, cc - left) for cr, cc in cells))
+        level = grown
+
+
+def outcome_class(values, game):
+    non_negative = values.le(ZERO, game)
+    non_positive = values.le(game, ZERO)
+    if non_negative and non_positive:
+        return ZERO_GAME
+    if non_negative:
+        return WHITE_WINS
+    if non_positive:
+        return BLACK_WINS
+    return FIRST_WINS
+
+
+def build_tablebase(path, max_size, solver=None, progress=None):
+    """
+    Solve every two-coloured region with up to max_size pieces and write the outcome classes
+    to path as records sorted by packed key. Only canonical regions (see game_state.canonical_region_key)
+    are stored; symmetric images and colour-swapped copies are found through them. progress(size, regions, seconds) is called after each region size.
+    Returns the number of regions written.
+    """
+    solver = solver or RegionSolver(max_region_size=max_size, max_live_pieces=max_size)
+    records = []
+    start = time.perf_counter()
+    size = 1
+    for shape in enumerate_shapes(max_size):
+        if len(shape) != size:
+            if progress is not None and size > 1:
+                progress(size, len(records), time.perf_counter() - start)
+            size = len(shape)
+        if size < 2:
+            continue
+        height = max(r for r, _ in shape) + 1
+        width = max(c for _, c in shape) + 1
+        if height * width > _MAX_AREA or height > 15 or width > 15:
+            continue
+        bits = [1 << (r * width + c) for r, c in sorted(shape)]
+        for colouring in range(1, (1 << len(bits)) - 1):
+            white = black = 0
+            for i, bit in enumerate(bits):
+                if colouring >> i & 1:
+                    white |= bit
+                else:
+                    black |= bit
+            key = (height, width, white, black)
+            if canonical_region_key(key) != (key, False):
+                # stored once under its canonical image
+                continue
+            outcome = outcome_class(solver.values, solver.region_value(key))
+            records.append(pack_key(key) + (outcome,))
+    if progress is not None:
+        progress(size, len(records), time.perf_counter() - start)
+    records.sort()
+    his = np.array([record[0] for record in records], dtype="<u8")
+    los = np.array([record[1] for record in records], dtype="<u8")
+    outcomes = np.array([record[2] for record in records], dtype="u1")
+    with open(path, "wb") as f:
+        # three contiguous columns, so lookups binary-search the mapped pages directly
+        f.write(_HEADER.pack(MAGIC, VERSION, max_size, len(records)))
+        f.write(his.tobytes())
+        f.write(los.tobytes())
+        f.write(outcomes.tobytes())
+    return len(records)
+
+
+class Tablebase:
+    """
+    Read-only, memory-mapped table of region outcome classes written by build_tablebase.
+    Opening it maps the file without reading it; lookups are two binary searches.
+    """
+    _open_tables = {}
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, version, max_size, count = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a Clobber tablebase (version {VERSION})")
+        self.path = path
+        self.max_size = max_size
+        self.count = count
+        self.hi = np.memmap(path, dtype="<u8", mode="r", offset=_HEADER.size, shape=(count,))
+        self.lo = np.memmap(path, dtype="<u8", mode="r", offset=_HEADER.size + 8 * count, shape=(count,))
+        self.outcomes = np.memmap(path, dtype="u1", mode="r", offset=_HEADER.size + 16 * count, shape=(count,))
+        self._keys = {}
+        self.probes = 0
+        self.hits = 0
+
+    @classmethod
+    def open(cls, path):
+        """
+        Return the tablebase for path, mapping the file once per process.
+        """
+        path = os.path.abspath(path)
+        if path not in cls._open_tables:
+            cls._open_tables[path] = cls(path)
+        return cls._open_tables[path]
+
+    def outcome(self, key):
+        """
+        Return the outcome class of a canonical region key, or None if the region is not in the table.
+        """
+        hi, lo = pack_key(key)
+        hi, lo = np.uint64(hi), np.uint64(lo)
+        first = int(np.searchsorted(self.hi, hi, side="left"))
+        last = int(np.searchsorted(self.hi, hi, side="right"))
+        if first == last:
+            return None
+        index = first + int(np.searchsorted(self.lo[first:last], lo))
+        if index < last and self.lo[index] == lo:
+            return int(self.outcomes[index])
+        return None
+
+    def winner(self, game_state: ClobberGameState):
+        """
+        Return the winner with perfect play from the position with the current side to move,
+        or None if the outcome classes of its live regions don't decide it.
+        Zero regions are dropped; what is left decides the game if all of it favours one colour
+        or if it is a single region.
+        """
+        self.probes += 1
+        white_pieces, black_pieces, _, white_isolated, black_isolated = game_state.features
+        if white_pieces + black_pieces - white_isolated - black_isolated > 4 * self.max_size:
+            return None
+        outcomes = []
+        for region in game_state.live_regions():
+            if popcount(region) > self.max_size:
+                return None
+            pieces = (game_state.rows, game_state.cols, game_state.white & region, game_state.black & region)
+            canonical = self._keys.get(pieces)
+            if canonical is None:
+                canonical = self._keys[pieces] = canonical_region_key(game_state.region_key(region))
+            key, swapped = canonical
+            outcome = self.outcome(key)
+            if outcome is None:
+                return None
+            if swapped and outcome in (WHITE_WINS, BLACK_WINS):
+                outcome = WHITE_WINS if outcome == BLACK_WINS else BLACK_WINS
+            if outcome != ZERO_GAME:
+                outcomes.append(outcome)
+        mover = game_state.current_player
+        other = 'B' if mover == 'W' else 'W'
+        if not outcomes:
+            winner = other
+        elif all(outcome == WHITE_WINS for outcome in outcomes):
+            winner = 'W'
+        elif all(outcome == BLACK_WINS for outcome in outcomes):
+            winner = 'B'
+        elif len(outcomes) == 1:
+            winner = mover
+        else:
+            return None
+        self.hits += 1
+        return winner
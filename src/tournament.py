@@ -0,0 +1,262 @@
+import contextlib
+import csv
+import itertools
+import json
+import math
+import os
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from game_state import ClobberGameState
+from game import ClobberAgent
+from heuristics import HEURISTICS
+from game_records import GameRecordWriter
+
+EngineConfig = namedtuple("EngineConfig", ["heuristic", "strategy", "depth", "adaptive"])
+
+CSV_FIELDS = ["game_id", "rows", "cols", "white", "black", "winner", "moves",
+              "white_nodes", "black_nodes", "white_seconds", "black_seconds", "opening_seed"]
+
+
+def engine_label(config):
+    label = f"{config.heuristic}/{config.strategy}/d{config.depth}"
+    return label + "/adaptive" if config.adaptive else label
+
+
+def config_grid(heuristics, strategies, depths, adaptive=(False,)):
+    """
+    Return every combination of the given heuristics (functions or names from heuristics.HEURISTICS),
+    strategies, depths and adaptive flags as EngineConfig tuples.
+    """
+    names = [getattr(heuristic, "__name__", heuristic) for heuristic in heuristics]
+    for name in names:
+        if name not in HEURISTICS:
+            raise ValueError(f"Unknown heuristic: {name}")
+    return [EngineConfig(*combination) for combination in itertools.product(names, strategies, depths, adaptive)]
+
+
+def schedule_games(configs, board_sizes, games_per_pairing=1, opening_plies=2, seed=0):
+    """
+    Return the game specs of a round robin: every ordered pair of different configs plays games_per_pairing
+    games as white and black on every board size. Each game starts with opening_plies random moves drawn from
+    its own opening seed (otherwise deterministic engines would repeat the same game). The list is shuffled
+    with seed, and the game ids, openings and order only depend on the arguments.
+    """
+    rng = random.Random(seed)
+    specs = []
+    for (rows, cols), (white, black), game in itertools.product(
+            board_sizes, itertools.permutations(configs, 2), range(games_per_pairing)):
+        specs.append({
+            "game_id": len(specs),
+            "rows": rows,
+            "cols": cols,
+            "white": white,
+            "black": black,
+            "opening_plies": opening_plies,
+            "opening_seed": rng.getrandbits(32),
+        })
+    rng.shuffle(specs)
+    return specs
+
+
+def play_game(spec, with_moves=False):
+    """
+    Play one scheduled game without printing anything and return its result record
+    (with_moves adds the moves of the game, opening included, as "move_list").
+    """
+    game = ClobberGameState(spec["rows"], spec["cols"])
+    rng = random.Random(spec["opening_seed"])
+    for _ in range(spec["opening_plies"]):
+        moves = game.get_possible_moves()
+        if not moves:
+            break
+        game.make_move(rng.choice(moves))
+    opening_plies = game.ply
+    white, black = EngineConfig(*spec["white"]), EngineConfig(*spec["black"])
+    agents = {
+        name: ClobberAgent(name, game, HEURISTICS[config.heuristic], config.strategy, config.depth, config.adaptive,
+                           quiet=True)
+        for name, config in (("W", white), ("B", black))
+    }
+    seconds = {"W": 0.0, "B": 0.0}
+    moves = 0
+    while not game.is_game_over():
+        player = game.current_player
+        start = time.perf_counter()
+        agents[player].play(game)
+        seconds[player] += time.perf_counter() - start
+        moves += 1
+    result = {
+        "game_id": spec["game_id"],
+        "rows": spec["rows"],
+        "cols": spec["cols"],
+        "white": engine_label(white),
+        "black": engine_label(black),
+        "winner": game.check_winner(),
+        "moves": moves,
+        "white_nodes": agents["W"].num_of_visits,
+        "black_nodes": agents["B"].num_of_visits,
+        "white_seconds": round(seconds["W"], 4),
+        "black_seconds": round(seconds["B"], 4),
+        "opening_seed": spec["opening_seed"],
+    }
+    if with_moves:
+        result["move_list"] = game.move_history()
+        result["opening_plies"] = opening_plies
+    return result
+
+
+def load_results(path):
+    """
+    Read the result records of a JSONL file; a missing file or a last line without its newline (cut off by
+    an interrupted run, see _drop_partial_line) are ignored.
+    """
+    results = []
+    if not os.path.exists(path):
+        return results
+    with open(path) as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            try:
+                results.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return results
+
+
+def _drop_partial_line(path):
+    """
+    Cut off a last line that an interrupted run left without its newline.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def run_tournament(specs, results_path, workers=None, csv_path=None, progress=None, records_path=None):
+    """
+    Play the scheduled games over a process pool and append every result to results_path (JSONL)
+    and csv_path, and the game itself to the game record file records_path (see game_records), as soon as
+    its game finishes. Games whose id is already in results_path are skipped, so an interrupted tournament
+    continues where it stopped. Returns all results, old and new.
+    """
+    _drop_partial_line(results_path)
+    results = load_results(results_path)
+    done = {result["game_id"] for result in results}
+    pending = [spec for spec in specs if spec["game_id"] not in done]
+    total = len(results) + len(pending)
+    with open(results_path, "a") as jsonl_file, \
+            (open(csv_path, "a", newline="") if csv_path else contextlib.nullcontext()) as csv_file, \
+            (GameRecordWriter(records_path) if records_path else contextlib.nullcontext()) as records:
+        writer = None
+        if csv_file is not None:
+            writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS)
+            if csv_file.tell() == 0:
+                writer.writeheader()
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(play_game, spec, records is not None) for spec in pending]
+            for future in as_completed(futures):
+                result = future.result()
+                move_list = result.pop("move_list", None)
+                opening_plies = result.pop("opening_plies", 0)
+                # the record goes first: the JSONL line marks the game as done for a resumed run
+                if records is not None:
+                    records.append(result["rows"], result["cols"], move_list, result["winner"],
+                                   opening_plies=opening_plies, white=result["white"], black=result["black"])
+                    records.flush()
+                jsonl_file.write(json.dumps(result) + "\n")
+                jsonl_file.flush()
+                if writer is not None:
+                    writer.writerow(result)
+                    csv_file.flush()
+                results.append(result)
+                if progress is not None:
+                    progress(len(results), total)
+    return results
+
+
+def elo_ratings(results, iterations=200):
+    """
+    Fit Bradley-Terry strengths to the game results (with half a win added both ways between every pair
+    that met, so unbeaten or winless engines stay finite) and return them as Elo ratings with mean 0.
+    """
+    wins = {}
+    engines = set()
+    for result in results:
+        white, black = result["white"], result["black"]
+        engines.update((white, black))
+        winner, loser = (white, black) if result["winner"] == "W" else (black, white)
+        wins[winner, loser] = wins.get((winner, loser), 0) + 1
+    for a, b in {tuple(sorted(pair)) for pair in wins}:
+        wins[a, b] = wins.get((a, b), 0) + 0.5
+        wins[b, a] = wins.get((b, a), 0) + 0.5
+    strengths = dict.fromkeys(engines, 1.0)
+    for _ in range(iterations):
+        updated = {}
+        for engine in engines:
+            total_wins = sum(count for (a, _), count in wins.items() if a == engine)
+            denominator = sum((wins.get((engine, other), 0) + wins.get((other, engine), 0)) /
+                              (strengths[engine] + strengths[other]) for other in engines if other != engine)
+            updated[engine] = total_wins / denominator if denominator else strengths[engine]
+        scale = math.exp(sum(math.log(s) for s in updated.values()) / len(updated)) if updated else 1.0
+        strengths = {engine: s / scale for engine, s in updated.items()}
+    return {engine: 400 * math.log10(s) for engine, s in strengths.items()}
+
+
+def summarize(results):
+    """
+    Return one row per engine, best first: Elo, games, wins, win rate, win rate as white and average nodes per game.
+    """
+    elo = elo_ratings(results)
+    rows = {engine: {"engine": engine, "elo": rating, "games": 0, "wins": 0, "white_games": 0, "white_wins": 0,
+                     "nodes": 0} for engine, rating in elo.items()}
+    for result in results:
+        for colour, engine in (("W", result["white"]), ("B", result["black"])):
+            row = rows[engine]
+            row["games"] += 1
+            row["nodes"] += result["white_nodes" if colour == "W" else "black_nodes"]
+            won = result["winner"] == colour
+            row["wins"] += won
+            if colour == "W":
+                row["white_games"] += 1
+                row["white_wins"] += won
+    table = []
+    for row in rows.values():
+        games = row["games"]
+        table.append({
+            "engine": row["engine"],
+            "elo": round(row["elo"]),
+            "games": games,
+            "wins": row["wins"],
+            "win_rate": row["wins"] / games if games else 0.0,
+            "white_win_rate": row["white_wins"] / row["white_games"] if row["white_games"] else 0.0,
+            "avg_nodes": row["nodes"] / games if games else 0.0,
+        })
+    return sorted(table, key=lambda row: row["elo"], reverse=True)
+
+
+def format_table(table):
+    lines = [f"{'engine':<40} {'elo':>6} {'games':>6} {'wins':>6} {'win%':>6} {'white%':>7} {'nodes/game':>11}"]
+    for row in table:
+        lines.append(f"{row['engine']:<40} {row['elo']:>6} {row['games']:>6} {row['wins']:>6} "
+                     f"{row['win_rate'] * 100:>5.1f}% {row['white_win_rate'] * 100:>6.1f}% {row['avg_nodes']:>11.0f}")
+    return "\n".join(lines)
+
+
+def win_rate_matrix(results):
+    """
+    Return {(engine, opponent): win rate of engine against opponent} over both colours.
+    """
+    games = {}
+    wins = {}
+    for result in results:
+        white, black = result["white"], result["black"]
+        for engine, opponent, colour in ((white, black, "W"), (black, white, "B")):
+            games[engine, opponent] = games.get((engine, opponent), 0) + 1
+            wins[engine, opponent] = wins.get((engine, opponent), 0) + (result["winner"] == colour)
+    return {pair: wins[pair] / count for pair, count in games.items()}
@@ -0,0 +1,148 @@
+import numpy as np
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+NO_MOVE = -1
+_ENTRY_BYTES = 8 + 8 + 4 + 2 + 1 + 1
+
+
+def encode_move(move):
+    """
+    Pack a move ((r, c), (new_r, new_c)) into a single int (coordinates below 256).
+    """
+    if move is None:
+        return NO_MOVE
+    (r, c), (new_r, new_c) = move
+    return (r << 24) | (c << 16) | (new_r << 8) | new_c
+
+
+def decode_move(code):
+    if code == NO_MOVE:
+        return None
+    return ((code >> 24) & 0xFF, (code >> 16) & 0xFF), ((code >> 8) & 0xFF, code & 0xFF)
+
+
+class TranspositionTable:
+    """
+    Fixed-size transposition table indexed by the Zobrist key of a position.
+    Each slot holds the full key, the searched depth, a bound flag (EXACT, LOWER_BOUND, UPPER_BOUND),
+    the value and the best move. A slot is replaced when it is empty, holds the same position,
+    comes from an older search (generation) or was searched to a smaller or equal depth.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        capacity = 1
+        while capacity * 2 * _ENTRY_BYTES <= max_bytes:
+            capacity *= 2
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.keys = np.zeros(capacity, dtype=np.uint64)
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.moves = np.full(capacity, NO_MOVE, dtype=np.int32)
+        self.depths = np.full(capacity, -1, dtype=np.int16)
+        self.flags = np.zeros(capacity, dtype=np.int8)
+        self.generations = np.zeros(capacity, dtype=np.uint8)
+        self.generation = 0
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def new_search(self):
+        """
+        Start a new search (e.g. a new turn); entries from older searches become preferred victims.
+        """
+        self.generation = (self.generation + 1) % 256
+
+    def clear(self):
+        self.depths.fill(-1)
+        self.moves.fill(NO_MOVE)
+        self.generation = 0
+
+    def probe(self, key):
+        """
+        Return (depth, flag, value, best_move) stored for the key, or None.
+        """
+        self.probes += 1
+        index = key & self.mask
+        depth = int(self.depths[index])
+        if depth < 0:
+            return None
+        if int(self.keys[index]) != key:
+            self.collisions += 1
+            return None
+        self.hits += 1
+        return depth, int(self.flags[index]), float(self.values[index]), decode_move(int(self.moves[index]))
+
+    def store(self, key, depth, flag, value, best_move=None):
+        index = key & self.mask
+        stored_depth = int(self.depths[index])
+        if stored_depth >= 0:
+            same_key = int(self.keys[index]) == key
+            if not same_key and self.generations[index] == self.generation and depth < stored_depth:
+                return
+            if not same_key:
+                self.replacements += 1
+            elif best_move is None:
+                best_move = decode_move(int(self.moves[index]))
+        self.keys[index] = key
+        self.depths[index] = depth
+        self.flags[index] = flag
+        self.values[index] = value
+        self.moves[index] = encode_move(best_move)
+        self.generations[index] = self.generation
+        self.stores += 1
+
+    def stats(self):
+        return {
+            "capacity": self.capacity,
+            "probes": self.probes,
+            "hits": self.hits,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "replacements": self.replacements,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+        }
+
+
+class SymmetricTable:
+    """
+    View of a TranspositionTable keyed by ClobberGameState.canonical_key() tuples, so positions that are
+    images of each other under a board symmetry or a colour swap share one slot.
+    Slots hold the value and best move of the canonical image: best moves are mapped through the symmetry,
+    and values of colour-swapped positions are negated with their bounds flipped. That is only sound for
+    a zero-sum heuristic (h(pos, W) == -h(pos, B)) that ignores the board's orientation, like evaluate.
+    """
+
+    def __init__(self, table, game_state):
+        self.table = table
+        self.game_state = game_state
+
+    def probe(self, key):
+        canonical, transform, swapped = key
+        entry = self.table.probe(canonical)
+        if entry is None:
+            return None
+        depth, flag, value, best_move = entry
+        if swapped:
+            value = -value
+            if flag != EXACT:
+                flag = LOWER_BOUND if flag == UPPER_BOUND else UPPER_BOUND
+        return depth, flag, value, self.game_state.transform_move(best_move, transform, inverse=True)
+
+    def store(self, key, depth, flag, value, best_move=None):
+        canonical, transform, swapped = key
+        if swapped:
+            value = -value
+            if flag != EXACT:
+                flag = LOWER_BOUND if flag == UPPER_BOUND else UPPER_BOUND
+        self.table.store(canonical, depth, flag, value, self.game_state.transform_move(best_move, transform))
+
+    def __getattr__(self, name):
+        return getattr(self.table, name)
@@ -0,0 +1,220 @@
+import glob
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from game_state import ClobberGameState, masks_to_array
+from game import ClobberAgent
+from heuristics import batch_features, EVALUATE_WEIGHTS, PHASES, HEURISTICS
+from mcts import batch_playouts
+from tournament import EngineConfig
+
+FEATURES = ("mobility", "pieces", "isolation")
+PHASE_HEURISTICS = ("mobility", "piece_count", "isolation")
+
+
+def _save_shard(path, rows, cols, game, white, black, to_move, winners):
+    """
+    Save labelled positions as a NumPy .npz shard: white and black as packed bit rows, to_move (1 white,
+    -1 black), result (1 when the side to move won the game, else 0) and the index of the game.
+    """
+    np.savez(path, rows=rows, cols=cols, game=game, white=white, black=black, to_move=to_move,
+             result=(winners[game] == to_move).astype(np.int8))
+
+
+def generate_random_shard(path, games, rows, cols, opening_plies=0, seed=0):
+    """
+    Play games uniformly random games at once (mcts.batch_playouts) and save every position they went
+    through, labelled with the result. The first opening_plies plies of every game are not saved.
+    Returns the number of positions.
+    """
+    rng = np.random.default_rng(seed)
+    start = ClobberGameState(rows, cols).encoded_board()
+    boards = np.repeat(start[np.newaxis], games, axis=0)
+    steps = []
+
+    def record(indices, stack, to_move):
+        steps.append((indices.astype(np.int32), np.packbits((stack == 1).reshape(len(stack), -1), axis=1),
+                      np.packbits((stack == -1).reshape(len(stack), -1), axis=1), to_move))
+
+    winners = batch_playouts(boards, np.ones(games, dtype=np.int8), rng, record)
+    steps = steps[opening_plies:]
+    game = np.concatenate([step[0] for step in steps])
+    _save_shard(path, rows, cols, game, np.concatenate([step[1] for step in steps]),
+                np.concatenate([step[2] for step in steps]), np.concatenate([step[3] for step in steps]), winners)
+    return len(game)
+
+
+def _engine_game(rows, cols, config, opening_plies, seed):
+    """
+    Play one quiet self-play game of the engine after opening_plies random plies.
+    Returns (whites, blacks, to_move, winner) of the positions after the opening.
+    """
+    game_state = ClobberGameState(rows, cols)
+    rng = random.Random(seed)
+    for _ in range(opening_plies):
+        moves = game_state.get_possible_moves()
+        if not moves:
+            break
+        game_state.make_move(rng.choice(moves))
+    agents = {name: ClobberAgent(name, game_state, HEURISTICS[config.heuristic], config.strategy, config.depth,
+                                 config.adaptive, quiet=True) for name in ('W', 'B')}
+    whites, blacks, to_move = [], [], []
+    while True:
+        whites.append(game_state.white)
+        blacks.append(game_state.black)
+        to_move.append(1 if game_state.current_player == 'W' else -1)
+        if game_state.is_game_over():
+            break
+        agents[game_state.current_player].play(game_state)
+    return whites, blacks, to_move, 1 if game_state.check_winner() == 'W' else -1
+
+
+def generate_engine_shard(path, games, rows, cols, engine, opening_plies=4, seed=0, workers=None):
+    """
+    Play games self-play games of the engine (an EngineConfig) over a process pool, each after
+    opening_plies random plies drawn from its own seed, and save every position after the opening,
+    labelled with the result. Slower than random games but the labels reflect sensible play.
+    Returns the number of positions.
+    """
+    engine = EngineConfig(*engine)
+    rng = random.Random(seed)
+    seeds = [rng.getrandbits(32) for _ in range(games)]
+    with ProcessPoolExecutor(workers) as executor:
+        played = list(executor.map(_engine_game, [rows] * games, [cols] * games, [engine] * games,
+                                   [opening_plies] * games, seeds))
+    size = rows * cols
+    game = np.concatenate([np.full(len(whites), index, dtype=np.int32)
+                           for index, (whites, _, _, _) in enumerate(played)])
+    boards = masks_to_array(rows, cols, [w for whites, _, _, _ in played for w in whites],
+                            [b for _, blacks, _, _ in played for b in blacks]).reshape(-1, size)
+    _save_shard(path, rows, cols, game, np.packbits(boards == 1, axis=1), np.packbits(boards == -1, axis=1),
+                np.array([t for _, _, to_move, _ in played for t in to_move], dtype=np.int8),
+                np.array([winner for _, _, _, winner in played], dtype=np.int8))
+    return len(game)
+
+
+def generate_shards(directory, shards, games_per_shard, rows, cols, engine=None, opening_plies=0, seed=0,
+                    workers=None, progress=None):
+    """
+    Write shards shard_00000.npz, ... to directory, each from its own seed: random games at once
+    without an engine, otherwise self-play games of the engine (an EngineConfig). Existing shards are kept,
+    so an interrupted run continues. progress(shard, positions, seconds) is called after every new shard.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for shard in range(shards):
+        path = os.path.join(directory, f"shard_{shard:05d}.npz")
+        paths.append(path)
+        if os.path.exists(path):
+            continue
+        start = time.perf_counter()
+        if engine is None:
+            positions = generate_random_shard(path, games_per_shard, rows, cols, opening_plies, seed + shard)
+        else:
+            positions = generate_engine_shard(path, games_per_shard, rows, cols, engine, opening_plies,
+                                              seed + shard, workers)
+        if progress is not None:
+            progress(shard, positions, time.perf_counter() - start)
+    return paths
+
+
+def shard_features(path, chunk=1 << 16):
+    """
+    Load a shard and return (features, progress, result): features is a float32 array (N, 3) of the
+    mobility, piece count and isolation differences from the side to move's point of view (the terms of
+    evaluate), progress the fraction of pieces already captured and result the labels.
+    """
+    with np.load(path) as shard:
+        rows, cols = int(shard["rows"]), int(shard["cols"])
+        white, black, to_move, result = shard["white"], shard["black"], shard["to_move"], shard["result"]
+    size = rows * cols
+    features = np.empty((len(result), len(FEATURES)), dtype=np.float32)
+    progress = np.empty(len(result), dtype=np.float32)
+    for begin in range(0, len(result), chunk):
+        end = begin + chunk
+        boards = (np.unpackbits(white[begin:end], axis=1, count=size).astype(np.int8) -
+                  np.unpackbits(black[begin:end], axis=1, count=size).astype(np.int8)).reshape(-1, rows, cols)
+        f = batch_features(boards, 'W')
+        sign = to_move[begin:end]
+        features[begin:end, 0] = sign * (f["my_moves"] - f["opp_moves"])
+        features[begin:end, 1] = sign * (f["my_pieces"] - f["opp_pieces"])
+        features[begin:end, 2] = sign * (f["opp_isolated"] - f["my_isolated"])
+        progress[begin:end] = 1 - (f["my_pieces"] + f["opp_pieces"]) / size
+    return features, progress, result
+
+
+def fit_logistic(features, result, l2=1e-6, iterations=50, tolerance=1e-9):
+    """
+    Fit P(side to move wins) = sigmoid(bias + features @ weights) by Newton's method over all positions
+    at once. Returns (bias, weights, mean log loss).
+    """
+    x = np.hstack([np.ones((len(features), 1)), features.astype(np.float64)])
+    y = result.astype(np.float64)
+    theta = np.zeros(x.shape[1])
+    for _ in range(iterations):
+        p = 1 / (1 + np.exp(-(x @ theta)))
+        gradient = x.T @ (p - y) / len(y) + l2 * theta
+        hessian = (x * (p * (1 - p))[:, None]).T @ x / len(y) + l2 * np.eye(len(theta))
+        step = np.linalg.solve(hessian, gradient)
+        theta -= step
+        if np.abs(step).max() < tolerance:
+            break
+    p = np.clip(1 / (1 + np.exp(-(x @ theta))), 1e-12, 1 - 1e-12)
+    loss = float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+    return float(theta[0]), theta[1:], loss
+
+
+def fit_weights(paths, phase_bounds=None):
+    """
+    Fit the weights of evaluate (Texel-style logistic regression on the game results) and of the phases
+    of DecisionTree.analyze_and_change_heuristic over the shards in paths.
+    evaluate's weights are scaled to the sum of the current ones, so scores keep their range;
+    score_scale turns a score into a win probability, sigmoid(score_scale * score).
+    A phase's weights are the fitted importance of each heuristic within it (|weight| times the spread of
+    its feature), normalised to sum 1. phase_bounds default to the progress limits of heuristics.PHASES.
+    """
+    if phase_bounds is None:
+        phase_bounds = [until for until, _ in PHASES[:-1]]
+    loaded = [shard_features(path) for path in paths]
+    features = np.concatenate([f for f, _, _ in loaded])
+    progress = np.concatenate([p for _, p, _ in loaded])
+    result = np.concatenate([r for _, _, r in loaded])
+    bias, weights, loss = fit_logistic(features, result)
+    total = sum(abs(EVALUATE_WEIGHTS[name]) for name in FEATURES)
+    scale = np.abs(weights).sum() / total
+    current = np.array([EVALUATE_WEIGHTS[name] for name in FEATURES], dtype=np.float64)
+    _, _, current_loss = fit_logistic(features @ current[:, None], result)
+    phases = []
+    limits = [-np.inf] + list(phase_bounds) + [np.inf]
+    for low, high in zip(limits, limits[1:]):
+        selected = (progress >= low) & (progress < high)
+        importance = np.full(len(FEATURES), 1 / len(FEATURES))
+        if selected.sum() > 100 and len(np.unique(result[selected])) == 2:
+            _, phase_weights, _ = fit_logistic(features[selected], result[selected])
+            spread = np.abs(phase_weights) * features[selected].std(axis=0)
+            if spread.sum() > 0:
+                importance = spread / spread.sum()
+        phases.append({"until": None if np.isinf(high) else float(high),
+                       "weights": {name: round(float(w), 4) for name, w in zip(PHASE_HEURISTICS, importance)},
+                       "positions": int(selected.sum())})
+    return {
+        "evaluate": {name: round(float(w / scale), 3) for name, w in zip(FEATURES, weights)},
+        "score_scale": float(scale),
+        "bias": bias,
+        "phases": phases,
+        "positions": len(result),
+        "log_loss": loss,
+        "current_log_loss": current_loss,
+    }
+
+
+def save_weights(weights, path):
+    with open(path, "w") as f:
+        json.dump(weights, f, indent=2)
+
+
+def shard_paths(directory):
+    return sorted(glob.glob(os.path.join(directory, "shard_*.npz")))
@@ -0,0 +1,31 @@
+import sys
+sys.path.append("src")
+from src.tuning import generate_shards, fit_weights, save_weights
+from src.tournament import EngineConfig
+import datetime
+
+if __name__ == "__main__":
+    data_dir = "tuning_data"
+    weights_path = "weights.json"
+    rows = 8
+    cols = 8
+    shards = 16
+    # None: random games played all at once (fast); an EngineConfig: self-play games of that engine
+    engine = None
+    # engine = EngineConfig("evaluate", "alpha-beta", 2, False)
+    games_per_shard = 8192 if engine is None else 500
+    opening_plies = 0 if engine is None else 4
+
+    time_start = datetime.datetime.now()
+    paths = generate_shards(data_dir, shards, games_per_shard, rows, cols, engine, opening_plies, seed=0,
+                            progress=lambda shard, positions, seconds:
+                            print(f"shard {shard}: {positions} positions in {seconds:.1f} s"))
+    weights = fit_weights(paths)
+    save_weights(weights, weights_path)
+    print(f"Fitted on {weights['positions']} positions: log loss {weights['log_loss']:.5f} "
+          f"(current weights {weights['current_log_loss']:.5f})")
+    print(f"evaluate weights: {weights['evaluate']}")
+    for phase in weights["phases"]:
+        print(f"phase until {phase['until']}: {phase['weights']} ({phase['positions']} positions)")
+    print(f"Saved to {weights_path}; load with heuristics.load_weights")
+    print(f"Time taken: {datetime.datetime.now()-time_start}")